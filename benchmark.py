@@ -0,0 +1,227 @@
+"""
+Benchmark
+=========
+
+Throughput of all algorithms for a matrix of sizes. Results
+are written as JSON, such that runs of different versions
+can be compared.
+
+    python benchmark.py --output benchmark.json
+
+
+Measures
+--------
+generations_per_second: generations (temperature steps for
+                        simulated annealing) per second
+evaluations_per_second: fitness evaluations requested per
+                        second (memoized ones included)
+peak_memory_bytes:      peak of memory allocated by Python
+                        and NumPy during a separate run
+
+Each measurement starts with an empty fitness cache.
+
+
+Sizes
+-----
+genetic_algorithm, vector_evaluated_genetic_algorithm:
+    size of population
+evolution_strategy:
+    number of offsprings (MU=7 are selected)
+real_evolution_strategy:
+    dimension of sphere problem (problem size), the binary
+    encoded algorithms solve the cylinder problem only
+simulated_annealing:
+    number of cities, for each move ('two_opt', 'candidates')
+    of the annealing loop
+
+"""
+
+import argparse
+from itertools import product
+import json
+import platform
+import random
+import sys
+import tracemalloc
+from time import perf_counter
+import numpy as np
+
+import genetic_algorithm
+import evolution_strategy
+import real_evolution_strategy
+import vector_evaluated_genetic_algorithm
+import simulated_annealing
+import simulated_annealing_data
+import tsplib
+
+
+SIZES_POPULATION   = [30, 1000, 10000]
+NUMBERS_OFFSPRINGS = [49, 490, 4900]
+DIMENSIONS         = [2, 30, 300]
+NUMBERS_CITIES     = [10, 20, 35]
+# uniform 2-opt and moves on candidate lists
+MOVES              = ['two_opt', 'candidates']
+
+
+"""Cases
+"""
+def cache_lookups(module):
+    cache = module.CylinderPhenotype.cache
+    return cache.hits + cache.misses
+
+def cold_cache(module):
+    """
+    Fitness cache is shared by all runs of a module, emptied
+    such that repeats and order of cases do not matter.
+    """
+    module.CylinderPhenotype.cache.clear()
+
+def genetic_algorithm_case(size):
+    cold_cache(genetic_algorithm)
+    population = genetic_algorithm.initialize_population(size=size)
+    def step(population):
+        return genetic_algorithm.next_generation(population, mutation_probability=0.01)
+    return population, step, lambda: cache_lookups(genetic_algorithm)
+
+def evolution_strategy_case(nr_offsprings):
+    cold_cache(evolution_strategy)
+    population = evolution_strategy.initialize_population(size=evolution_strategy.MU)
+    def step(population):
+        return evolution_strategy.next_generation(population, nr_offsprings=nr_offsprings)
+    return population, step, lambda: cache_lookups(evolution_strategy)
+
+def real_evolution_strategy_case(dimension):
+    problem    = real_evolution_strategy.Problem( real_evolution_strategy.sphere,
+                                                  lower=[-5]*dimension, upper=[5]*dimension )
+    population = real_evolution_strategy.initialize_population(problem=problem)
+    def step(population):
+        return real_evolution_strategy.next_generation(population, problem)
+    return population, step, lambda: problem.evaluations
+
+def vega_case(size):
+    cold_cache(vector_evaluated_genetic_algorithm)
+    population = vector_evaluated_genetic_algorithm.initialize_population(size=size)
+    def step(population):
+        return vector_evaluated_genetic_algorithm.next_generation(population, mutation_probability=0.01)
+    return population, step, lambda: cache_lookups(vector_evaluated_genetic_algorithm)
+
+class FirstCities:
+    """First cities of the data set as instance of simulated
+    annealing (distance and candidate lists)
+    """
+
+    distance = staticmethod(simulated_annealing_data.distance)
+
+    def __init__(self, number_cities):
+        self.number_cities = number_cities
+
+    def neighbours(self, k):
+        matrix = simulated_annealing_data.MATRIX[:self.number_cities, :self.number_cities]
+        return tsplib.nearest_neighbours(matrix, k)
+
+def simulated_annealing_case(number_cities, move='two_opt', iterations=200):
+    """
+    One step is one temperature of the annealing loop,
+    tour over the first cities of the data set.
+    """
+    moves    = simulated_annealing.bind_move(move, FirstCities(number_cities))
+    tour     = simulated_annealing.Tour(range(number_cities))
+    path_len = simulated_annealing_data.path_length(tour.cities)
+    state    = {'tour': tour, 'length': path_len, 'shortest': list(tour.cities), 'shortest_length': path_len,
+                'T': 3000, 'evaluations': 0}
+
+    def step(state):
+        state['tour'], state['length'], state['shortest'], state['shortest_length'] = simulated_annealing.anneal(
+            state['tour'], state['length'], state['shortest'], state['shortest_length'],
+            state['T'], iterations, *moves )
+        state['evaluations'] += iterations
+        state['T'] = 0.8*state['T']
+        return state
+
+    return state, step, lambda: state['evaluations']
+
+# name, case, sizes and variants (keyword arguments of case)
+CASES = [
+    ('genetic_algorithm',                  genetic_algorithm_case,       SIZES_POPULATION,   [{}]),
+    ('evolution_strategy',                 evolution_strategy_case,      NUMBERS_OFFSPRINGS, [{}]),
+    ('real_evolution_strategy',            real_evolution_strategy_case, DIMENSIONS,         [{}]),
+    ('vector_evaluated_genetic_algorithm', vega_case,                    SIZES_POPULATION,   [{}]),
+    ('simulated_annealing',                simulated_annealing_case,     NUMBERS_CITIES,
+        [{'move': move} for move in MOVES])
+]
+
+
+"""Measurement
+"""
+def measure(case, size, generations, seed, variant={}):
+    """
+    Run case for a number of generations, returns seconds
+    and number of evaluations.
+    """
+    random.seed(seed)
+    np.random.seed(seed)
+    state, step, count_evaluations = case(size, **variant)
+
+    evaluations = count_evaluations()
+    start       = perf_counter()
+    for _ in range(generations):
+        state = step(state)
+    return perf_counter() - start, count_evaluations() - evaluations
+
+def peak_memory(case, size, generations, seed, variant={}):
+    tracemalloc.start()
+    try:
+        measure(case, size, generations, seed, variant)
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+def run(generations=20, memory_generations=3, repeat=3, seed=0):
+    results = []
+    for name, case, sizes, variants in CASES:
+        for size, variant in product(sizes, variants):
+            result = dict({'algorithm': name, 'size': size, 'generations': generations}, **variant)
+            try:
+                # best of repeated runs, least disturbed by other processes
+                seconds, evaluations = min( measure(case, size, generations, seed, variant)
+                                            for _ in range(repeat) )
+                result.update({
+                    'seconds':                seconds,
+                    'evaluations':            evaluations,
+                    'generations_per_second': generations/seconds,
+                    'evaluations_per_second': evaluations/seconds,
+                    'peak_memory_bytes':      peak_memory(case, size, memory_generations, seed, variant)
+                })
+            except Exception as error:
+                result['error'] = '%s: %s' % (type(error).__name__, error)
+            results.append(result)
+            print(json.dumps(result), file=sys.stderr)
+
+    return {
+        'python':   platform.python_version(),
+        'numpy':    np.__version__,
+        'platform': platform.platform(),
+        'seed':     seed,
+        'results':  results
+    }
+
+
+def main():
+
+    parser = argparse.ArgumentParser(description='Throughput benchmark of all algorithms.')
+    parser.add_argument('--output', help='JSON file, default: standard output')
+    parser.add_argument('--generations', type=int, default=20)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    report = json.dumps(run(generations=args.generations, repeat=args.repeat, seed=args.seed), indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(report + '\n')
+    else:
+        print(report)
+
+
+if __name__ == '__main__':
+    main()
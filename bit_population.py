@@ -0,0 +1,67 @@
+"""
+Bit Population
+==============
+
+Binary genotypes of a whole population, stored as one
+bit matrix instead of one string per individual.
+
+    row:    individual
+    column: bit of genotype
+
+All operators work on the whole matrix at once, instead
+of looping over individuals and characters.
+
+
+Operators
+---------
+- random_genotypes:       random initialization
+- flip_mutation:          inverts each bit with probability p
+- single_point_crossover: recombines pairs of rows
+
+Decoding of rows into variables: see encoding.decode
+
+"""
+
+import numpy as np
+
+
+def random_genotypes(size, length):
+    """
+    Bit matrix of `size` random genotypes of `length` bits.
+    """
+    return np.random.randint(0, 2, size=(size, length), dtype=np.uint8)
+
+def flip_mutation(genotypes, probability):
+    """
+    Inverts each bit of each genotype with probability p,
+    one Bernoulli mask for the whole matrix. Mutates in place,
+    returns which rows have been changed.
+    """
+    mask = np.random.random(genotypes.shape) <= probability
+    np.bitwise_xor(genotypes, mask, out=genotypes)
+    return mask.any(axis=1)
+
+def single_point_crossover(mothers, fathers):
+    """
+    Row wise single point recombination, equal to
+    recombining gen1, gen2 of each pair of rows into
+
+        gen1[:point] + gen2[point:]
+        gen1[point:] + gen2[:point]
+
+    with one random point per pair.
+    """
+    size, length = mothers.shape
+    points  = np.random.randint(0, length+1, size=(size, 1))
+    columns = np.arange(length)
+
+    first = np.where(columns < points, mothers, fathers)
+
+    # second offspring is gen1 shifted left by point,
+    # filled up with the head of gen2
+    shifted = columns + points
+    second  = np.where( shifted < length,
+                        np.take_along_axis(mothers, np.minimum(shifted, length-1), axis=1),
+                        np.take_along_axis(fathers, np.maximum(shifted-length, 0), axis=1) )
+
+    return [first, second]
@@ -0,0 +1,134 @@
+"""
+Checkpoint
+==========
+
+Save and resume state of long runs (population, strategy
+parameters, champions, random number generators).
+
+
+File format
+-----------
+One binary file, arrays are stored raw and can be memory
+mapped instead of being read:
+
+    magic       8 bytes    b'EACKPT01'
+    length      8 bytes    length of header, little endian
+    header      JSON       small state, dtype, shape and
+                           offset of each array
+    arrays      raw        each aligned to 64 bytes
+
+Files are written to a temporary file first and replaced
+atomically, an interrupted save keeps the last checkpoint.
+
+"""
+
+import json
+import os
+import random
+import struct
+import numpy as np
+
+
+MAGIC     = b'EACKPT01'
+ALIGNMENT = 64
+
+
+def save(path, arrays, state=None):
+    """
+    Write arrays (name -> ndarray) and small JSON serializable
+    state into one checkpoint file.
+    """
+    arrays = dict((name, np.ascontiguousarray(array)) for name, array in arrays.items())
+
+    # offsets relative to start of data section
+    layout = {}
+    offset = 0
+    for name, array in arrays.items():
+        layout[name] = {'dtype': array.dtype.str, 'shape': list(array.shape), 'offset': offset}
+        offset = aligned(offset + array.nbytes)
+
+    header = json.dumps({'state': state or {}, 'arrays': layout}).encode('utf-8')
+    start  = aligned(len(MAGIC) + 8 + len(header))
+
+    temporary = path + '.tmp'
+    with open(temporary, 'wb') as f:
+        f.write(MAGIC)
+        f.write(struct.pack('<Q', len(header)))
+        f.write(header)
+        for name, array in arrays.items():
+            f.seek(start + layout[name]['offset'])
+            f.write(array.tobytes())
+        f.truncate(start + offset)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temporary, path)
+
+def load(path, mmap=True):
+    """
+    Read checkpoint file, returns arrays and state. Arrays are
+    memory mapped copy on write: changes stay in memory.
+    """
+    with open(path, 'rb') as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            raise ValueError('not a checkpoint file: ' + path)
+        length = struct.unpack('<Q', f.read(8))[0]
+        header = json.loads(f.read(length).decode('utf-8'))
+    start = aligned(len(MAGIC) + 8 + length)
+
+    arrays = {}
+    for name, entry in header['arrays'].items():
+        dtype = np.dtype(entry['dtype'])
+        shape = tuple(entry['shape'])
+        if mmap and dtype.itemsize and int(np.prod(shape)):
+            arrays[name] = np.memmap(path, dtype=dtype, mode='c', offset=start+entry['offset'], shape=shape)
+        else:
+            with open(path, 'rb') as f:
+                f.seek(start + entry['offset'])
+                arrays[name] = np.fromfile(f, dtype=dtype, count=int(np.prod(shape))).reshape(shape)
+
+    return arrays, header['state']
+
+def aligned(offset):
+    return -(-offset // ALIGNMENT) * ALIGNMENT
+
+
+"""Random number generators
+"""
+def rng_state():
+    """
+    State of Python and NumPy random number generators,
+    split into arrays and JSON serializable state.
+    """
+    version, python_keys, python_gauss = random.getstate()
+    name, numpy_keys, position, has_gauss, cached_gauss = np.random.get_state()
+
+    arrays = {
+        'rng_python': np.array(python_keys, dtype=np.uint32),
+        'rng_numpy':  np.array(numpy_keys, dtype=np.uint32)
+    }
+    state = {
+        'rng_python': [version, python_gauss],
+        'rng_numpy':  [name, int(position), int(has_gauss), float(cached_gauss)]
+    }
+    return arrays, state
+
+def set_rng_state(arrays, state):
+    version, python_gauss = state['rng_python']
+    random.setstate((version, tuple(int(key) for key in arrays['rng_python']), python_gauss))
+
+    name, position, has_gauss, cached_gauss = state['rng_numpy']
+    np.random.set_state((name, np.array(arrays['rng_numpy']), position, has_gauss, cached_gauss))
+
+
+"""Phenotypes
+"""
+def genotype_array(phenotypes):
+    """
+    Genotype strings as fixed length byte strings,
+    missing phenotypes (None) as empty string.
+    """
+    return np.array([p.genotype.encode('ascii') if p is not None else b'' for p in phenotypes],
+                    dtype='S' + str(max([len(p.genotype) for p in phenotypes if p is not None] + [1])))
+
+def genotype_strings(array):
+    return [genotype.decode('ascii') for genotype in array]
@@ -0,0 +1,219 @@
+"""
+Covariance Matrix Adaptation Evolution Strategy (CMA-ES)
+========================================================
+
+Evolution strategy in R^n, which adapts a full covariance
+matrix of its mutation distribution. Unlike isotropic or
+component wise step sizes (evolution_strategy.py,
+real_evolution_strategy.py), correlated mutations follow
+ill-conditioned and non-separable fitness landscapes.
+
+Problems, populations, champions and summary are shared
+with real_evolution_strategy.py.
+
+
+Algorithm
+---------
+- Initialization of distribution: mean m, step size sigma,
+  covariance C = I
+- Loop until 100 generations
+  - sample LAMBDA offsprings x = m + sigma * B D z,
+    z ~ N(0, I), C = B D^2 B^T (whole batch at once)
+  - evaluate offsprings
+  - move mean to weighted mean of MU best offsprings
+  - update evolution paths p_sigma, p_c
+  - rank one and rank mu update of C
+  - cumulative step size adaptation of sigma
+
+
+Strategy parameters
+-------------------
+Default parameters after N. Hansen, The CMA Evolution
+Strategy: A Tutorial (2016):
+
+Number of offsprings
+LAMBDA = 4 + floor(3 ln n)
+
+Number of parents
+MU = LAMBDA / 2
+
+"""
+
+from math import log, sqrt, exp
+import numpy as np
+
+import evolution
+from evolution import MaxGenerations, Stagnation
+from instrumentation import PhaseTimer, NO_TIMER
+from selection import ranked_indices
+from real_evolution_strategy import CYLINDER, RealPopulation, get_champion, create_summary
+
+
+class CMAState:
+    """Mutation distribution and its strategy parameters
+    """
+
+    def __init__(self, mean, sigma, nr_offsprings=None):
+
+        n = len(mean)
+
+        # Distribution
+        self.mean  = np.array(mean, dtype=float)
+        self.sigma = float(sigma)
+        self.C     = np.eye(n)
+        self.B     = np.eye(n)
+        self.D     = np.ones(n)
+        self.invsqrtC = np.eye(n)
+
+        # Evolution paths
+        self.pc = np.zeros(n)
+        self.ps = np.zeros(n)
+
+        # Selection and recombination
+        self.nr_offsprings = nr_offsprings or 4 + int(3*log(n))
+        self.mu            = int(self.nr_offsprings/2)
+        weights            = log(self.mu + 0.5) - np.log(np.arange(1, self.mu+1))
+        self.weights       = weights/weights.sum()
+        self.mueff         = 1/(self.weights**2).sum()
+
+        # Adaptation
+        self.cc    = (4 + self.mueff/n)/(n + 4 + 2*self.mueff/n)
+        self.cs    = (self.mueff + 2)/(n + self.mueff + 5)
+        self.c1    = 2/((n + 1.3)**2 + self.mueff)
+        self.cmu   = min(1 - self.c1, 2*(self.mueff - 2 + 1/self.mueff)/((n + 2)**2 + self.mueff))
+        self.damps = 1 + 2*max(0, sqrt((self.mueff - 1)/(n + 1)) - 1) + self.cs
+        self.chiN  = sqrt(n)*(1 - 1/(4*n) + 1/(21*n**2))
+
+        self.generation  = 0
+        self.evaluations = 0
+        self.eigen_evaluations = 0
+
+        # Offsprings of last generation
+        self.population = None
+
+    def __len__(self):
+        return self.nr_offsprings
+
+    def __str__(self):
+        return ''.join([
+            "Mean: ",        str(np.round(self.mean, 3)),
+            "\tSigma: ",     str(self.sigma),
+            "\tCondition: ", str((self.D.max()/self.D.min())**2),
+            "\tGeneration: ", str(self.generation)
+        ])
+
+    def update_eigen(self):
+        """
+        Decompose C = B D^2 B^T, lazily: only every
+        LAMBDA/(c1+cmu)/n/10 evaluations, O(n^3).
+        """
+        if self.evaluations - self.eigen_evaluations <= self.nr_offsprings/(self.c1 + self.cmu)/len(self.mean)/10:
+            return
+        self.eigen_evaluations = self.evaluations
+        self.C        = np.triu(self.C) + np.triu(self.C, 1).T
+        D2, self.B    = np.linalg.eigh(self.C)
+        self.D        = np.sqrt(np.maximum(D2, 1e-20))
+        self.invsqrtC = (self.B/self.D) @ self.B.T
+
+
+"""CMA-ES methodologies
+"""
+def initialize_population(problem=CYLINDER, mean=None, sigma=None, nr_offsprings=None):
+    """
+    Distribution centered at random point within bounds
+    unless mean is given, sigma 0.3 of mean range.
+    """
+    if mean is None:
+        mean = problem.lower + np.random.random(problem.dimension)*(problem.upper - problem.lower)
+    if sigma is None:
+        sigma = 0.3*np.mean(problem.upper - problem.lower)
+    return CMAState(mean, sigma, nr_offsprings)
+
+def sample(state, problem):
+    """
+    Offsprings x = m + sigma * B D z, clipped to bounds.
+    Returns offsprings and their steps y = (x - m)/sigma.
+    """
+    z       = np.random.standard_normal((state.nr_offsprings, len(state.mean)))
+    y       = (z*state.D) @ state.B.T
+    objects = problem.clip(state.mean + state.sigma*y)
+    return [objects, (objects - state.mean)/state.sigma]
+
+def next_generation(state, problem=CYLINDER, timer=NO_TIMER):
+
+    n = len(state.mean)
+
+    with timer('mutation'):
+        objects, y = sample(state, problem)
+
+    offsprings = RealPopulation(objects, np.tile(state.sigma*np.sqrt(np.diag(state.C)), (len(objects), 1)))
+    with timer('evaluate'):
+        offsprings.evaluate(problem)
+    state.evaluations += len(offsprings)
+    state.population   = offsprings
+
+    with timer('selection'):
+        selected = y[ranked_indices(offsprings)[:state.mu]]
+
+    with timer('crossover'):
+        # weighted recombination
+        y_w         = state.weights @ selected
+        state.mean  = state.mean + state.sigma*y_w
+
+    with timer('adaptation'):
+        # evolution paths
+        state.ps = (1 - state.cs)*state.ps \
+                 + sqrt(state.cs*(2 - state.cs)*state.mueff)*(state.invsqrtC @ y_w)
+        norm_ps  = np.linalg.norm(state.ps)
+        hsig     = norm_ps/sqrt(1 - (1 - state.cs)**(2*(state.generation + 1)))/state.chiN < 1.4 + 2/(n + 1)
+        state.pc = (1 - state.cc)*state.pc \
+                 + hsig*sqrt(state.cc*(2 - state.cc)*state.mueff)*y_w
+
+        # rank one and rank mu update of covariance matrix
+        state.C = (1 - state.c1 - state.cmu)*state.C \
+                + state.c1*(np.outer(state.pc, state.pc) + (1 - hsig)*state.cc*(2 - state.cc)*state.C) \
+                + state.cmu*(selected.T*state.weights) @ selected
+
+        # cumulative step size adaptation
+        state.sigma = state.sigma*exp((state.cs/state.damps)*(norm_ps/state.chiN - 1))
+
+        state.update_eigen()
+
+    state.generation += 1
+    return state
+
+def evolve(state, problem=CYLINDER, stop=(), timer=NO_TIMER):
+    """
+    Yield generations until one of the stop criteria is met,
+    see evolution.py. Champion is best offspring of a generation.
+    """
+    return evolution.evolve( state,
+                             lambda state: next_generation(state, problem, timer),
+                             get_champion=lambda state: get_champion(state.population),
+                             count_evaluations=lambda: problem.evaluations,
+                             stop=stop )
+
+
+def main():
+
+    NUMBER_GENERATIONS = 100
+    # stop after generations without improvement
+    STAGNATION         = 50
+    # print time spent in each phase
+    INSTRUMENT         = False
+
+    timer     = PhaseTimer() if INSTRUMENT else NO_TIMER
+    state     = initialize_population(problem=CYLINDER)
+    champions = [ generation.champion for generation in evolve(
+                      state, problem=CYLINDER, timer=timer,
+                      stop=[MaxGenerations(NUMBER_GENERATIONS), Stagnation(STAGNATION)] ) ]
+
+    create_summary(champions)
+    print(state)
+    print('Evaluations: ', CYLINDER.evaluations)
+    if INSTRUMENT:
+        print(timer)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,95 @@
+"""
+Encoding and Decoding
+=====================
+
+Binary genotypes encode n variables, each with its own
+bit width. A variable with code c (integer value of its
+bits) decodes to
+
+    x = min + step * c
+
+such that a width of l bits covers [min, min + step*(2^l - 1)].
+
+
+Gray Code
+---------
+Optionally variables are Gray coded, neighbouring values
+then differ in one bit only (no Hamming cliffs), e.g.
+
+    3 = 010,  4 = 110   (instead of 011, 100)
+
+
+Lookup tables
+-------------
+Variables of up to LOOKUP_WIDTH bits are decoded by a
+precomputed table with the value of every code, Gray
+decoding, min and step included.
+
+"""
+
+from functools import lru_cache
+import numpy as np
+
+
+LOOKUP_WIDTH = 16
+
+
+def binary_to_real(bin_string, min=0, step=1, gray=False):
+    """
+    Decode a single variable given as string of '0' and '1'.
+    """
+    code = int(bin_string, 2) if bin_string else 0
+    if gray:
+        code = gray_to_binary(code)
+    return min + step*code
+
+def gray_to_binary(code):
+    """
+    Binary value of Gray code, works on integers as well
+    as on arrays of integers.
+    """
+    shift = 1
+    while np.any(code >> shift):
+        code  = code ^ (code >> shift)
+        shift = shift*2
+    return code
+
+def binary_to_gray(code):
+    return code ^ (code >> 1)
+
+@lru_cache(maxsize=None)
+def lookup_table(width, min=0, step=1, gray=False):
+    """
+    Decoded value of each code of given width.
+    """
+    codes = np.arange(2**width, dtype=np.int64)
+    if gray:
+        codes = gray_to_binary(codes)
+    table = min + step*codes
+    table.setflags(write=False)
+    return table
+
+def decode(genotypes, widths, min=0, step=1, gray=False):
+    """
+    Decode a bit matrix (one row per genotype) into a matrix
+    with one column per variable. Variables are given by
+    their bit widths, min and step are either one value for
+    all variables or a list with one value per variable.
+    """
+    minimums = min  if np.ndim(min)  else [min]*len(widths)
+    steps    = step if np.ndim(step) else [step]*len(widths)
+
+    columns = []
+    start   = 0
+    for width, minimum, step in zip(widths, minimums, steps):
+        weights = 2**np.arange(width-1, -1, -1, dtype=np.int64)
+        codes   = genotypes[:, start:start+width] @ weights
+        if width <= LOOKUP_WIDTH:
+            columns.append(lookup_table(width, minimum, step, gray)[codes])
+        else:
+            if gray:
+                codes = gray_to_binary(codes)
+            columns.append(minimum + step*codes)
+        start += width
+
+    return np.column_stack(columns) if columns else np.empty((len(genotypes), 0))
@@ -0,0 +1,167 @@
+"""
+Evolution
+=========
+
+Generator based run of an evolutionary algorithm. Instead
+of a fixed number of generations, generations are yielded
+one by one until a stop criterion is met:
+
+    for generation in evolve(population, next_generation,
+                             stop=[Stagnation(20), TimeBudget(60)]):
+        print(generation)
+
+Without stop criterion generations are yielded forever.
+
+
+Stop criteria
+-------------
+MaxGenerations:   number of generations
+Stagnation:       best fitness not improved for n generations
+TargetFitness:    best fitness reached target
+TimeBudget:       wall clock seconds
+EvaluationBudget: number of fitness evaluations
+
+Fitness is minimized, criteria on fitness are ignored by
+algorithms without scalar fitness. Algorithms without a
+single champion (multi objective) may give an indicator
+of the whole population instead, e.g. negative hypervolume.
+
+"""
+
+from time import perf_counter
+
+
+class Generation:
+    """State of run after a generation
+    """
+
+    def __init__(self, number, population, champion, fitness, best_fitness, evaluations, seconds):
+
+        self.number       = number
+        self.population   = population
+        self.champion     = champion
+        # fitness of champion (or indicator), best fitness of run so far
+        self.fitness      = fitness
+        self.best_fitness = best_fitness
+        self.evaluations  = evaluations
+        self.seconds      = seconds
+
+    def __str__(self):
+        return ''.join([
+            "Generation: ",     str(self.number),
+            "\tFitness: ",      str(self.fitness),
+            "\tBest: ",         str(self.best_fitness),
+            "\tEvaluations: ",  str(self.evaluations),
+            "\tSeconds: ",      str(round(self.seconds, 3))
+        ])
+
+
+def evolve( population, next_generation, get_champion=None,
+            fitness=lambda champion: champion.fitness,
+            indicator=None, count_evaluations=None, stop=() ):
+    """
+    Yield state of each generation until one of the stop
+    criteria is met.
+
+    next_generation:   population -> population
+    get_champion:      population -> best individual (optional)
+    fitness:           champion -> fitness
+    indicator:         population -> fitness of generation
+                       (optional), replaces fitness of champion
+    count_evaluations: () -> number of evaluations so far (optional)
+    """
+    start       = perf_counter()
+    evaluations = count_evaluations() if count_evaluations else 0
+
+    number       = 0
+    best_fitness = None
+    while True:
+        population = next_generation(population)
+        number    += 1
+
+        champion        = get_champion(population) if get_champion else None
+        current_fitness = fitness(champion) if champion is not None else None
+        if indicator is not None:
+            current_fitness = indicator(population)
+        if current_fitness is not None and (best_fitness is None or current_fitness < best_fitness):
+            best_fitness = current_fitness
+
+        generation = Generation(
+            number, population, champion, current_fitness, best_fitness,
+            count_evaluations() - evaluations if count_evaluations else None,
+            perf_counter() - start
+        )
+        # criteria are updated before generation is yielded,
+        # their state is then up to date (checkpoints)
+        stopped = any([criterion(generation) for criterion in stop])
+        yield generation
+
+        if stopped:
+            return
+
+
+"""Stop criteria
+"""
+class MaxGenerations:
+
+    def __init__(self, generations):
+        self.generations = generations
+
+    def __call__(self, generation):
+        return generation.number >= self.generations
+
+class Stagnation:
+    """
+    Best fitness did not improve by more than tolerance
+    for a number of generations.
+    """
+
+    def __init__(self, generations, tolerance=0):
+        self.generations = generations
+        self.tolerance   = tolerance
+        self.best        = None
+        self.since       = 0
+
+    def __call__(self, generation):
+        if generation.best_fitness is None:
+            return False
+        if self.best is None or generation.best_fitness < self.best - self.tolerance:
+            self.best  = generation.best_fitness
+            self.since = 0
+        else:
+            self.since += 1
+        return self.since >= self.generations
+
+    def state(self):
+        """
+        Best fitness and generations since, JSON serializable
+        (checkpoints).
+        """
+        return [float(self.best) if self.best is not None else None, self.since]
+
+    def restore(self, state):
+        self.best, self.since = state
+
+class TargetFitness:
+
+    def __init__(self, target):
+        self.target = target
+
+    def __call__(self, generation):
+        return generation.best_fitness is not None and generation.best_fitness <= self.target
+
+class TimeBudget:
+
+    def __init__(self, seconds):
+        self.seconds = seconds
+
+    def __call__(self, generation):
+        return generation.seconds >= self.seconds
+
+class EvaluationBudget:
+
+    def __init__(self, evaluations):
+        self.evaluations = evaluations
+
+    def __call__(self, generation):
+        return generation.evaluations is not None and generation.evaluations >= self.evaluations
@@ -17,6 +17,7 @@ Algorithm
     - mutate offsprings
     - mutate strategy parameters of offsprings
     - add offsprings to population
+  - evaluate offsprings (optionally in thread or process pool)
   - selection
 
 
@@ -37,15 +38,38 @@ RHO = 3
 
 """
 
+import os
 from random import randint, random, shuffle, gauss
 from math import log, pi, exp, sqrt
+from concurrent.futures import ProcessPoolExecutor
 from copy import copy
+import numpy as np
 from terminalplot import plot
 
+from selection import rank_based_selection
+from encoding import binary_to_real
+from fitness_cache import FitnessCache
+import evolution
+import checkpoint
+from instrumentation import PhaseTimer, NO_TIMER
+from evolution import MaxGenerations, Stagnation
+
+
+MU     = 7
+KAPPA  = 15
+LAMBDA = 49
+RHO    = 3
+
 class CylinderPhenotype:
     """Individual (phenotype, creature)
     """
 
+    __slots__ = ('genotype', 'diameter', 'height', 'fitness', 'constraint', 'age', 'p_mutation')
+
+    # Evaluations memoized by genotype, shared by all
+    # individuals. Replace to resize or disable (maxsize=0).
+    cache = FitnessCache(maxsize=1024)
+
     def __init__(self, genotype):
 
         # Genotype (properties, chromosomes)
@@ -77,13 +101,19 @@ class CylinderPhenotype:
         return [self.diameter, self.height]
 
     def evaluate(self):
-        # surface
-        self.fitness    = pi*self.diameter**2/2 + pi*self.diameter*self.height
-        # volume greater than 300
-        self.constraint = pi*self.diameter**2*self.height/4 >= 300
+        self.fitness, self.constraint = self.cache.lookup(
+            self.genotype, lambda: objectives(self.diameter, self.height))
         return [self.fitness, self.constraint]
 
 
+def objectives(diameter, height):
+    # surface
+    fitness    = pi*diameter**2/2 + pi*diameter*height
+    # volume greater than 300
+    constraint = pi*diameter**2*height/4 >= 300
+    return (fitness, constraint)
+
+
 """Genetic algorithm methodologies
 """
 def initialize_population(size):
@@ -100,20 +130,71 @@ def initialize_population(size):
 
     return population
 
-def next_generation(population):
+def next_generation(population, executor=None, chunksize=8, nr_offsprings=LAMBDA, timer=NO_TIMER):
+
+    next_generation = crossover(population, nr_offsprings, timer=timer)
+
+    # Evaluate offsprings, parents keep their fitness
+    evaluate(next_generation, executor=executor, chunksize=chunksize, timer=timer)
 
-    next_generation = crossover(population)
-    next_generation = select_phenotypes(next_generation)
+    with timer('selection'):
+        next_generation = select_phenotypes(next_generation)
 
-    # Evaluate creatures
-    for phenotype in next_generation:
-        phenotype.decode()
-        phenotype.evaluate()
+    # age of individuals selected several times increases once
+    for phenotype in dict((id(phenotype), phenotype) for phenotype in next_generation).values():
         phenotype.age += 1
 
     return next_generation
 
-def select_phenotypes(population, mu=7, kappa=15):
+def evaluate(population, executor=None, chunksize=8, timer=NO_TIMER):
+    """
+    Decode and evaluate creatures not evaluated yet.
+
+    executor: concurrent.futures thread or process pool,
+              distinct genotypes unknown to the fitness
+              cache are evaluated in chunks in the pool.
+              None: evaluate in this thread.
+    """
+    pending = [phenotype for phenotype in population if phenotype.fitness is None]
+
+    if executor is None:
+        for phenotype in pending:
+            with timer('decode'):
+                phenotype.decode()
+            with timer('evaluate'):
+                phenotype.evaluate()
+        return population
+
+    with timer('evaluate'):
+        cache     = CylinderPhenotype.cache
+        genotypes = list(dict.fromkeys( phenotype.genotype for phenotype in pending
+                                        if phenotype.genotype not in cache ))
+        results   = dict(zip(genotypes, executor.map(evaluate_genotype, genotypes, chunksize=chunksize)))
+        # evaluated in pool: misses of this process's cache
+        cache.misses += len(genotypes)
+
+        for phenotype in pending:
+            if phenotype.genotype in results:
+                phenotype.diameter, phenotype.height, phenotype.fitness, phenotype.constraint \
+                    = results[phenotype.genotype]
+                cache.put(phenotype.genotype, (phenotype.fitness, phenotype.constraint))
+            else:
+                phenotype.decode()
+                phenotype.evaluate()
+
+    return population
+
+def evaluate_genotype(genotype):
+    """
+    Evaluation of a single genotype within a worker of a pool,
+    returns diameter, height, fitness and constraint. Bypasses
+    the fitness cache, caching is done by the caller.
+    """
+    phenotype = CylinderPhenotype(genotype)
+    phenotype.decode()
+    return (phenotype.diameter, phenotype.height) + objectives(phenotype.diameter, phenotype.height)
+
+def select_phenotypes(population, mu=MU, kappa=KAPPA):
     """
     Rank based selection (Stochastic universal sampling)
     """
@@ -123,33 +204,11 @@ def select_phenotypes(population, mu=7, kappa=15):
                                 key=lambda ind: ind.fitness,
                                 reverse=False )
 
-    # List with boundaries of interval for rank probability
-    probability_interval = get_probability_interval(len(sorted_population))
-
-    selection = []
-    for _ in range(mu):
-        rand = random()
-        for i, sub_interval in enumerate(probability_interval):
-            if rand <= sub_interval:
-                break
-        # selected individuals are copied into selection
-        # otherwise several items in selection would point
-        # to the same individual.
-        selection.append(copy(sorted_population[i]))
-
-    return selection
-
-def get_probability_interval(max_rank):
-    """
-    Create list with probability of ranks, interval
-    of rank 1 is first in list
-    """ 
-    sum_ranks = max_rank*(max_rank+1)/2
-    interval = [float(max_rank)/sum_ranks]
-    for rank in range(max_rank-1,0,-1):
-        interval.append( interval[-1] + float(rank)/sum_ranks )
-
-    return interval
+    # selected individuals are not copied, an individual
+    # selected several times appears several times. Genotypes
+    # of selected individuals are never changed in place,
+    # offsprings are new individuals.
+    return [sorted_population[i] for i in rank_based_selection(len(sorted_population), mu)]
 
 def mutate(population):
     for phenotype in population:
@@ -180,32 +239,35 @@ def random_genotype_mutation(genotype, probability):
 
     return ''.join(mutation)
 
-def crossover(population, nr_offsprings=49):
-
+def crossover(population, nr_offsprings=LAMBDA, timer=NO_TIMER):
+    """
+    Create and mutate offsprings, which are appended to
+    population without being evaluated.
+    """
     offsprings = []
-    while len(offsprings) < 49:
+    with timer('crossover'):
+        while len(offsprings) < nr_offsprings:
 
-        # randomly select three distinct parents
-        shuffle(population)
-        p1 = population.pop()
-        p2 = population.pop()
-        p3 = population.pop()
+            # randomly select three distinct parents
+            shuffle(population)
+            p1 = population.pop()
+            p2 = population.pop()
+            p3 = population.pop()
 
-        # Create new genotype
-        offspring_genotype = three_parent_recombine(p1.genotype, p2.genotype, p3.genotype)
+            # Create new genotype
+            offspring_genotype = three_parent_recombine(p1.genotype, p2.genotype, p3.genotype)
 
-        # Create new phenotype from genotype
-        offsprings.append(CylinderPhenotype(offspring_genotype))
-        offsprings[-1].decode()
-        offsprings[-1].evaluate()
+            # Create new phenotype from genotype
+            offsprings.append(CylinderPhenotype(offspring_genotype))
 
-        # Put parents back into population
-        population.append(p1)
-        population.append(p2)
-        population.append(p3)
+            # Put parents back into population
+            population.append(p1)
+            population.append(p2)
+            population.append(p3)
 
     # Mutate offsprings and append to population
-    offsprings = mutate(offsprings)
+    with timer('mutation'):
+        offsprings = mutate(offsprings)
     population += offsprings
 
     return population
@@ -227,15 +289,63 @@ def get_champion(population):
     return copy(champion)
 
 
-"""Encoding and Decoding
+def evolve(population, executor=None, stop=(), timer=NO_TIMER):
+    """
+    Yield generations until one of the stop criteria is met,
+    see evolution.py.
+    """
+    return evolution.evolve( population,
+                             lambda population: next_generation(population, executor=executor, timer=timer),
+                             get_champion=get_champion,
+                             count_evaluations=lambda: CylinderPhenotype.cache.misses,
+                             stop=stop )
+
+
+"""Checkpoint
 """
-def binary_to_real(bin_string, min=0, step=1):
-    base = 1
-    num = 0
-    for i in bin_string[::-1]:
-        num += base*int(i)
-        base *= 2
-    return num
+def save_checkpoint(path, population, champions, stagnation=None):
+    """
+    Save genotypes and strategy parameters of population and
+    champions, state of random number generators and of
+    stagnation criterion, see checkpoint.py.
+    """
+    arrays, state = checkpoint.rng_state()
+    for name, phenotypes in [('population', population), ('champions', champions)]:
+        arrays[name]                 = checkpoint.genotype_array(phenotypes)
+        arrays[name + '_age']        = np.array([p.age if p else 0 for p in phenotypes], dtype=np.int32)
+        arrays[name + '_p_mutation'] = np.array([p.p_mutation if p else 0 for p in phenotypes])
+    if stagnation is not None:
+        state['stagnation'] = stagnation.state()
+    checkpoint.save(path, arrays, state)
+
+def load_checkpoint(path, stagnation=None):
+    """
+    Restore population, champions, state of random number
+    generators and of stagnation criterion (if given),
+    returns population and champions.
+    """
+    arrays, state = checkpoint.load(path)
+    checkpoint.set_rng_state(arrays, state)
+    if stagnation is not None and 'stagnation' in state:
+        stagnation.restore(state['stagnation'])
+
+    restored = {}
+    for name in ['population', 'champions']:
+        restored[name] = []
+        for genotype, age, p_mutation in zip( checkpoint.genotype_strings(arrays[name]),
+                                              arrays[name + '_age'],
+                                              arrays[name + '_p_mutation'] ):
+            if not genotype:
+                restored[name].append(None)
+                continue
+            phenotype            = CylinderPhenotype(genotype)
+            phenotype.age        = int(age)
+            phenotype.p_mutation = float(p_mutation)
+            phenotype.decode()
+            phenotype.evaluate()
+            restored[name].append(phenotype)
+
+    return restored['population'], restored['champions']
 
 
 """Plot
@@ -250,22 +360,50 @@ def create_summary(population):
         'Superchamp Diameter: ', str(superchamp.diameter),
         ' Height: ', str(superchamp.height),
         ' Surface: ', str(superchamp.fitness)
-    ]))    
+    ]))
+    print(CylinderPhenotype.cache)
 
 
 def main():
 
     SIZE_POPULATION      = 7
     NUMBER_GENERATIONS   = 100
-
-    population = initialize_population(size=SIZE_POPULATION)
-    champions  = []
-
-    for _ in range(NUMBER_GENERATIONS):
-        population = next_generation(population)
-        champions.append(get_champion(population))
+    # stop after generations without improvement
+    STAGNATION           = 50
+    # path of checkpoint file (resumed if existing), None: no checkpoints
+    CHECKPOINT           = None
+    CHECKPOINT_INTERVAL  = 10
+    # print time spent in each phase
+    INSTRUMENT           = False
+    # number of processes evaluating offsprings, None: evaluate in main process
+    PROCESSES            = None
+
+    timer = PhaseTimer() if INSTRUMENT else NO_TIMER
+
+    # state of stop criterion is checkpointed as well
+    stagnation = Stagnation(STAGNATION)
+    if CHECKPOINT and os.path.exists(CHECKPOINT):
+        population, champions = load_checkpoint(CHECKPOINT, stagnation)
+    else:
+        population = initialize_population(size=SIZE_POPULATION)
+        champions  = []
+
+    executor = ProcessPoolExecutor(max_workers=PROCESSES) if PROCESSES else None
+    try:
+        for generation in evolve( population, executor=executor,
+                                  stop=[ MaxGenerations(NUMBER_GENERATIONS - len(champions)),
+                                         stagnation ],
+                                  timer=timer ):
+            champions.append(generation.champion)
+            if CHECKPOINT and generation.number % CHECKPOINT_INTERVAL == 0:
+                save_checkpoint(CHECKPOINT, generation.population, champions, stagnation)
+    finally:
+        if executor:
+            executor.shutdown()
 
     create_summary(champions)
+    if INSTRUMENT:
+        print(timer)
 
 
 if __name__ == '__main__':
@@ -0,0 +1,102 @@
+"""
+Fitness Cache
+=============
+
+Memoization of fitness evaluations, keyed on genotype.
+
+Selection copies individuals, hence many individuals of
+a generation share the same genotype. Evaluating every
+genotype only once saves expensive fitness functions.
+
+
+Lookups are thread safe, the cache can be shared by a
+thread pool evaluating individuals.
+
+
+Eviction
+--------
+maxsize = None: unbounded
+maxsize = 0:    nothing is stored, every lookup is a miss
+maxsize = n:    least recently used genotype is evicted
+                as soon as more than n are stored
+
+"""
+
+from collections import OrderedDict
+from threading import Lock
+
+
+class FitnessCache:
+    """Least recently used cache with hit and miss counters
+    """
+
+    def __init__(self, maxsize=1024):
+
+        self.maxsize = maxsize
+        self.hits    = 0
+        self.misses  = 0
+        self._values = OrderedDict()
+        self._lock   = Lock()
+
+    def __str__(self):
+        return ''.join([
+            "Cache Size: ",  str(len(self)),
+            "\tHits: ",      str(self.hits),
+            "\tMisses: ",    str(self.misses),
+            "\tHit Rate: ",  str(round(self.hit_rate(), 3))
+        ])
+
+    def __len__(self):
+        return len(self._values)
+
+    def __contains__(self, key):
+        return key in self._values
+
+    def lookup(self, key, function):
+        """
+        Cached value of key, function() is called and
+        its result stored in case of a miss.
+        """
+        value = self.get(key)
+        if value is None:
+            value = function()
+            self.put(key, value)
+        return value
+
+    def get(self, key, default=None):
+        with self._lock:
+            if key in self._values:
+                self.hits += 1
+                self._values.move_to_end(key)
+                return self._values[key]
+            self.misses += 1
+            return default
+
+    def put(self, key, value):
+        if self.maxsize == 0:
+            return
+        with self._lock:
+            self._values[key] = value
+            self._values.move_to_end(key)
+            if self.maxsize is not None and len(self._values) > self.maxsize:
+                self._values.popitem(last=False)
+
+    def hit_rate(self):
+        lookups = self.hits + self.misses
+        return float(self.hits)/lookups if lookups else 0.0
+
+    def clear(self):
+        with self._lock:
+            self.hits   = 0
+            self.misses = 0
+            self._values.clear()
+
+    def __getstate__(self):
+        # locks can not be pickled (process pools)
+        state = self.__dict__.copy()
+        del state['_lock']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = Lock()
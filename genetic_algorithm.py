@@ -31,6 +31,12 @@ Genotype:
 Encoded properties h and d build genotype
 length of genotype: ceil( log2(31) ) + ceil( log2(31) ) = 5 + 5
 
+Population:
+Genotypes of the whole population are stored as one
+bit matrix (see bit_population.py), such that selection,
+mutation, crossover and evaluation run on all individuals
+at once.
+
 Champions:
 Best creature of each population, over several
 populaitons.
@@ -43,15 +49,31 @@ Compare fitness of populations for mutation probabilities
 
 """
 
-from random import randint, random, shuffle
+import os
 from math import log, pi
 from copy import copy
+import numpy as np
 from terminalplot import plot
 
+from bit_population import random_genotypes, flip_mutation, single_point_crossover
+from encoding import binary_to_real, decode
+from selection import rank_based_selection
+from fitness_cache import FitnessCache
+import evolution
+import checkpoint
+from instrumentation import PhaseTimer, NO_TIMER
+from evolution import MaxGenerations, Stagnation
+
 class CylinderPhenotype:
     """Individual (phenotype, creature)
     """
 
+    __slots__ = ('genotype', 'diameter', 'height', 'fitness', 'constraint')
+
+    # Evaluations memoized by genotype, shared by all
+    # individuals. Replace to resize or disable (maxsize=0).
+    cache = FitnessCache(maxsize=1024)
+
     def __init__(self, genotype):
 
         # Genotype (properties, chromosomes)
@@ -76,39 +98,155 @@ class CylinderPhenotype:
         return [self.diameter, self.height]
 
     def evaluate(self):
-        # surface
-        self.fitness    = pi*self.diameter**2/2 + pi*self.diameter*self.height
-        # volume greater than 300
-        self.constraint = pi*self.diameter**2*self.height/4 >= 300
+        self.fitness, self.constraint = self.cache.lookup(
+            self.genotype, lambda: objectives(self.diameter, self.height))
+        return [self.fitness, self.constraint]
+
+
+class CylinderPopulation:
+    """Whole population (struct of arrays)
+
+    Genotypes of all individuals are rows of one
+    bit matrix, properties and fitness are arrays
+    with one entry per individual.
+
+    Only rows marked as changed are decoded and
+    evaluated again (all rows, if changed is None).
+    """
+
+    def __init__(self, genotypes, diameter=None, height=None, fitness=None, constraint=None, changed=None):
+
+        # Genotypes (bit matrix, one row per individual)
+        self.genotypes  = genotypes
+        self.diameter   = diameter
+        self.height     = height
+        self.fitness    = fitness
+        self.constraint = constraint
+        # rows modified since last evaluation
+        self.changed    = changed
+
+    def __len__(self):
+        return len(self.genotypes)
+
+    def __getitem__(self, i):
+        phenotype = CylinderPhenotype(''.join(str(bit) for bit in self.genotypes[i]))
+        phenotype.diameter   = int(self.diameter[i])
+        phenotype.height     = int(self.height[i])
+        phenotype.fitness    = float(self.fitness[i])
+        phenotype.constraint = bool(self.constraint[i])
+        return phenotype
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+    def take(self, indices):
+        """
+        New population of rows at indices, one gather per
+        array instead of one copy per individual.
+        """
+        return CylinderPopulation( self.genotypes[indices], self.diameter[indices], self.height[indices],
+                                   self.fitness[indices], self.constraint[indices],
+                                   np.zeros(len(indices), dtype=bool) )
+
+    def changed_rows(self):
+        if self.changed is None or self.diameter is None or self.fitness is None:
+            return None
+        return np.flatnonzero(self.changed)
+
+    def calculate_decimals(self):
+        rows = self.changed_rows()
+        if rows is None:
+            decimals      = decode(self.genotypes, [5, 5])
+            self.diameter = decimals[:, 0]
+            self.height   = decimals[:, 1]
+        elif len(rows):
+            decimals            = decode(self.genotypes[rows], [5, 5])
+            self.diameter[rows] = decimals[:, 0]
+            self.height[rows]   = decimals[:, 1]
+        return [self.diameter, self.height]
+
+    def evaluate(self):
+        """
+        Evaluate each distinct genotype of changed rows once,
+        genotypes known by the cache are not evaluated at all.
+        """
+        rows = self.changed_rows()
+        if rows is None:
+            self.fitness, self.constraint = self.evaluate_rows(slice(None))
+        elif len(rows):
+            self.fitness[rows], self.constraint[rows] = self.evaluate_rows(rows)
+        self.changed = np.zeros(len(self), dtype=bool)
         return [self.fitness, self.constraint]
 
+    def evaluate_rows(self, rows):
+        cache  = CylinderPhenotype.cache
+        length = self.genotypes.shape[1]
+        keys, first, inverse = np.unique( decode(self.genotypes[rows], [length])[:, 0],
+                                          return_index=True, return_inverse=True )
+        # duplicates within population are hits as well
+        cache.hits += len(inverse) - len(keys)
+
+        genotypes  = [format(key, '0%db' % length) for key in keys]
+        fitness    = np.empty(len(keys))
+        constraint = np.empty(len(keys), dtype=bool)
+        missing    = []
+        for i, genotype in enumerate(genotypes):
+            value = cache.get(genotype)
+            if value is None:
+                missing.append(i)
+            else:
+                fitness[i], constraint[i] = value
+
+        # evaluate unknown genotypes in batch
+        if missing:
+            first = first[missing]
+            fitness[missing], constraint[missing] = objectives( self.diameter[rows][first],
+                                                                self.height[rows][first] )
+            for i in missing:
+                cache.put(genotypes[i], (float(fitness[i]), bool(constraint[i])))
+
+        return [fitness[inverse], constraint[inverse]]
+
+
+def objectives(diameter, height):
+    """
+    Fitness and constraint of cylinders, for single
+    values as well as for arrays of values.
+    """
+    # surface
+    fitness    = pi*diameter**2/2 + pi*diameter*height
+    # volume greater than 300
+    constraint = pi*diameter**2*height/4 >= 300
+    return (fitness, constraint)
+
 
 """Genetic algorithm methodologies
 """
 def initialize_population(size):
 
-    population = []
-    for _ in range(size):
-        population.append(CylinderPhenotype(
-            # Random Genotype of length 10
-            ''.join([str(randint(0,1)) for _ in range(10)])
-        ))
+    # Random Genotypes of length 10
+    population = CylinderPopulation(random_genotypes(size, 10))
 
-        population[-1].calculate_decimals()
-        population[-1].evaluate()
+    population.calculate_decimals()
+    population.evaluate()
 
     return population
 
-def next_generation(population, mutation_probability=0.01):
+def next_generation(population, mutation_probability=0.01, timer=NO_TIMER):
 
-    next_generation = select_phenotypes(population)
-    next_generation = mutate(next_generation, mutation_probability)
-    next_generation = crossover(next_generation)
+    with timer('selection'):
+        next_generation = select_phenotypes(population)
+    with timer('mutation'):
+        next_generation = mutate(next_generation, mutation_probability)
+    with timer('crossover'):
+        next_generation = crossover(next_generation)
 
     # Evaluate creatures
-    for phenotype in next_generation:
-        phenotype.calculate_decimals()
-        phenotype.evaluate()
+    with timer('decode'):
+        next_generation.calculate_decimals()
+    with timer('evaluate'):
+        next_generation.evaluate()
 
     return next_generation
 
@@ -117,85 +255,47 @@ def select_phenotypes(population):
     Rank based selection (Stochastic universal sampling)
     """
 
-    # list, sorted by rank and filtered by constraint
-    sorted_population = sorted( [creature for creature in population if creature.constraint],
-                                key=lambda ind: ind.fitness,
-                                reverse=False )
-
-    # List with boundaries of interval for rank probability
-    probability_interval = get_probability_interval(len(sorted_population))
-
-    selection = []
-    for _ in range(len(population)):
-        rand = random()
-        for i, sub_interval in enumerate(probability_interval):
-            if rand <= sub_interval:
-                break
-        # selected individuals are copied into selection
-        # otherwise several items in selection would point
-        # to the same individual.
-        selection.append(copy(sorted_population[i]))
-
-    return selection
+    # indices, sorted by rank and filtered by constraint
+    feasible = np.flatnonzero(population.constraint)
+    ranked   = feasible[np.argsort(population.fitness[feasible], kind='stable')]
 
-def get_probability_interval(max_rank):
-    """
-    Create list with probability of ranks, interval
-    of rank 1 is first in list
-    """ 
-    sum_ranks = max_rank*(max_rank+1)/2
-    interval = [float(max_rank)/sum_ranks]
-    for rank in range(max_rank-1,0,-1):
-        interval.append( interval[-1] + float(rank)/sum_ranks )
+    ranks = rank_based_selection(len(ranked), len(population))
 
-    return interval
+    # rows of selected individuals are gathered at once,
+    # decoded values and fitness are carried over.
+    return population.take(ranked[ranks])
 
 def mutate(population, probability):
-    for phenotype in population:
-        phenotype.genotype = random_genotype_mutation(phenotype.genotype, probability)
+    population.changed |= flip_mutation(population.genotypes, probability)
     return population
 
-def random_genotype_mutation(genotype, probability):
-    """
-    Inverts each bit of genotype with probability p.
-    """
-    mutation = []
-    for bit in genotype:
-        if random() <= probability:
-            bit = '0' if bit == '1' else '1'
-        mutation.append(bit)
-
-    return ''.join(mutation)
-
 def crossover(population, breeder_size=10):
     """
     Chose n creatures and mate those, two parents
     giving birth to two offsprings. Offsprings will
     replace their parents.
     """
-    offsprings = []
-    shuffle(population)
-    for _ in range(int(breeder_size/2)):
-        # Genotype of mother and father will be
-        # replaced with genotype of offsprings
-        mother = population.pop()
-        father = population.pop()
-        offspring_genotypes = singel_point_recombine(mother.genotype, father.genotype)
-        mother.genotype = offspring_genotypes[0]
-        father.genotype = offspring_genotypes[1]
-        offsprings.append(mother)
-        offsprings.append(father)
-
-    population += offsprings
+    breeders = np.random.choice(len(population), 2*int(breeder_size/2), replace=False)
+    mothers  = breeders[0::2]
+    fathers  = breeders[1::2]
 
-    return population
+    # Genotypes of mothers and fathers will be
+    # replaced with genotypes of offsprings
+    offspring_genotypes = single_point_crossover(population.genotypes[mothers], population.genotypes[fathers])
+    population.genotypes[mothers] = offspring_genotypes[0]
+    population.genotypes[fathers] = offspring_genotypes[1]
+    population.changed[breeders]  = True
 
-def singel_point_recombine(gen1, gen2):
-    point = randint(0,min(len(gen1),len(gen2)))
-    return [gen1[:point]+gen2[point:], gen1[point:]+gen2[:point]]
+    return population
 
 def get_champion(population):
 
+    if isinstance(population, CylinderPopulation):
+        feasible = np.flatnonzero(population.constraint)
+        if not len(feasible):
+            return None
+        return population[feasible[np.argmin(population.fitness[feasible])]]
+
     fitness  = None
     champion = None
     for phenotype in population:
@@ -206,15 +306,57 @@ def get_champion(population):
     return copy(champion)
 
 
-"""Encoding and Decoding
+def evolve(population, mutation_probability=0.01, stop=(), timer=NO_TIMER):
+    """
+    Yield generations until one of the stop criteria is met,
+    see evolution.py.
+    """
+    return evolution.evolve( population,
+                             lambda population: next_generation(population, mutation_probability, timer),
+                             get_champion=get_champion,
+                             count_evaluations=lambda: CylinderPhenotype.cache.misses,
+                             stop=stop )
+
+
+"""Checkpoint
 """
-def binary_to_real(bin_string, min=0, step=1):
-    base = 1
-    num = 0
-    for i in bin_string[::-1]:
-        num += base*int(i)
-        base *= 2
-    return num
+def save_checkpoint(path, population, champions, stagnation=None):
+    """
+    Save genotypes of population, champions, state of
+    random number generators and of stagnation criterion,
+    see checkpoint.py.
+    """
+    arrays, state = checkpoint.rng_state()
+    arrays['genotypes'] = population.genotypes
+    arrays['champions'] = checkpoint.genotype_array(champions)
+    if stagnation is not None:
+        state['stagnation'] = stagnation.state()
+    checkpoint.save(path, arrays, state)
+
+def load_checkpoint(path, stagnation=None):
+    """
+    Restore population, champions, state of random number
+    generators and of stagnation criterion (if given),
+    returns population and champions.
+    """
+    arrays, state = checkpoint.load(path)
+    checkpoint.set_rng_state(arrays, state)
+    if stagnation is not None and 'stagnation' in state:
+        stagnation.restore(state['stagnation'])
+
+    population = CylinderPopulation(arrays['genotypes'])
+    population.calculate_decimals()
+    population.evaluate()
+
+    champions = []
+    for genotype in checkpoint.genotype_strings(arrays['champions']):
+        champion = CylinderPhenotype(genotype) if genotype else None
+        if champion:
+            champion.calculate_decimals()
+            champion.evaluate()
+        champions.append(champion)
+
+    return population, champions
 
 
 """Plot
@@ -229,7 +371,8 @@ def create_summary(population):
         'Superchamp Diameter: ', str(superchamp.diameter),
         ' Height: ', str(superchamp.height),
         ' Surface: ', str(superchamp.fitness)
-    ]))    
+    ]))
+    print(CylinderPhenotype.cache)
 
 
 def main():
@@ -237,15 +380,35 @@ def main():
     SIZE_POPULATION      = 30
     NUMBER_GENERATIONS   = 100
     MUTATION_PROBABILITY = 0.01
-
-    population = initialize_population(size=SIZE_POPULATION)
-    champions  = []
-
-    for _ in range(NUMBER_GENERATIONS):
-        population = next_generation(population, mutation_probability=MUTATION_PROBABILITY)
-        champions.append(get_champion(population))
+    # stop after generations without improvement
+    STAGNATION           = 50
+    # path of checkpoint file (resumed if existing), None: no checkpoints
+    CHECKPOINT           = None
+    CHECKPOINT_INTERVAL  = 10
+    # print time spent in each phase
+    INSTRUMENT           = False
+
+    timer = PhaseTimer() if INSTRUMENT else NO_TIMER
+
+    # state of stop criterion is checkpointed as well
+    stagnation = Stagnation(STAGNATION)
+    if CHECKPOINT and os.path.exists(CHECKPOINT):
+        population, champions = load_checkpoint(CHECKPOINT, stagnation)
+    else:
+        population = initialize_population(size=SIZE_POPULATION)
+        champions  = []
+
+    for generation in evolve( population, mutation_probability=MUTATION_PROBABILITY,
+                              stop=[ MaxGenerations(NUMBER_GENERATIONS - len(champions)),
+                                     stagnation ],
+                              timer=timer ):
+        champions.append(generation.champion)
+        if CHECKPOINT and generation.number % CHECKPOINT_INTERVAL == 0:
+            save_checkpoint(CHECKPOINT, generation.population, champions, stagnation)
 
     create_summary(champions)
+    if INSTRUMENT:
+        print(timer)
 
 
 if __name__ == '__main__':
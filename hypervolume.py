@@ -0,0 +1,213 @@
+"""
+Hypervolume
+===========
+
+Hypervolume indicator of a set of objective vectors: volume
+of the region dominated by the set and bounded by a
+reference point. All objectives are minimized, points not
+strictly better than the reference point in every objective
+do not contribute. A single scalar to compare fronts, it
+grows with convergence and with diversity of a front.
+
+
+Exact computation
+-----------------
+Two objectives: sweep over points sorted by first objective,
+O(n log n).
+
+Three objectives: sweep over points sorted by third
+objective, the area of the two dimensional staircase of
+points below the sweep plane is maintained incrementally.
+
+More objectives: slicing along last objective (recursive,
+exponential in number of objectives).
+
+
+Incremental indicator
+---------------------
+Hypervolume keeps the front of the previous generation. Only
+the points which left or entered the front are processed,
+each one changes the hypervolume by its exclusive
+contribution:
+
+    contribution(p, S) = HV(S + p) - HV(S)
+
+Two objectives: the staircase of the front is kept, the
+contribution of a point is the rectangle between its
+neighbours, O(log n).
+
+Three objectives: contribution of p is the volume of the box
+between p and reference point, minus the hypervolume of
+all other points limited to that box. In case more than
+half the front changed, the front is recomputed instead.
+
+"""
+
+from bisect import bisect_left, bisect_right
+import numpy as np
+
+from pareto import non_dominated_sort
+
+
+def hypervolume(points, reference):
+    """
+    Exact hypervolume of points (one row per point).
+    """
+    reference = np.asarray(reference, dtype=float)
+    points    = np.asarray(points, dtype=float).reshape(-1, len(reference))
+    points    = points[np.all(points < reference, axis=1)]
+    if not len(points):
+        return 0.0
+
+    if len(reference) == 1:
+        return float(reference[0] - points[:, 0].min())
+    if len(reference) == 2:
+        return _area(points, reference)
+    if len(reference) == 3:
+        return _volume(points, reference)
+    return _slice(points, reference)
+
+def _area(points, reference):
+    order  = np.lexsort((points[:, 1], points[:, 0]))
+    area   = 0.0
+    lowest = reference[1]
+    for x, y in points[order].tolist():
+        if y < lowest:
+            area  += (reference[0] - x)*(lowest - y)
+            lowest = y
+    return float(area)
+
+def _volume(points, reference):
+    points    = points[np.argsort(points[:, 2], kind='stable')]
+    staircase = Staircase(reference[:2])
+    volume    = 0.0
+    for i, (x, y, z) in enumerate(points.tolist()):
+        staircase.add(x, y)
+        top     = points[i+1, 2] if i + 1 < len(points) else reference[2]
+        volume += staircase.area*(top - z)
+    return float(volume)
+
+def _slice(points, reference):
+    points = points[np.argsort(points[:, -1], kind='stable')]
+    volume = 0.0
+    for i in range(len(points)):
+        top     = points[i+1, -1] if i + 1 < len(points) else reference[-1]
+        if top > points[i, -1]:
+            volume += hypervolume(points[:i+1, :-1], reference[:-1])*(top - points[i, -1])
+    return float(volume)
+
+def contribution(point, others, reference):
+    """
+    Exclusive hypervolume of point with respect to others.
+    """
+    point     = np.asarray(point, dtype=float)
+    reference = np.asarray(reference, dtype=float)
+    if not np.all(point < reference):
+        return 0.0
+    box    = float(np.prod(reference - point))
+    others = np.asarray(others, dtype=float).reshape(-1, len(reference))
+    # others limited to box between point and reference
+    return box - hypervolume(np.maximum(others, point), reference)
+
+
+class Staircase:
+    """Two dimensional front, sorted by first objective,
+    and its area up to reference point.
+    """
+
+    def __init__(self, reference):
+
+        self.reference = [float(value) for value in reference]
+        self.xs        = []
+        self.ys        = []
+        self.area      = 0.0
+
+    def __len__(self):
+        return len(self.xs)
+
+    def dominated(self, x, y):
+        i = bisect_right(self.xs, x)
+        return i > 0 and self.ys[i-1] <= y
+
+    def _contribution(self, i):
+        # rectangle between neighbours
+        right = self.xs[i+1] if i + 1 < len(self.xs) else self.reference[0]
+        upper = self.ys[i-1] if i > 0 else self.reference[1]
+        return (right - self.xs[i])*(upper - self.ys[i])
+
+    def add(self, x, y):
+        """
+        Add point, points it dominates are removed.
+        """
+        if x >= self.reference[0] or y >= self.reference[1] or self.dominated(x, y):
+            return
+        i = bisect_left(self.xs, x)
+        while i < len(self.xs) and self.ys[i] >= y:
+            self.area -= self._contribution(i)
+            del self.xs[i], self.ys[i]
+        self.xs.insert(i, x)
+        self.ys.insert(i, y)
+        self.area += self._contribution(i)
+
+    def remove(self, x, y):
+        i = bisect_left(self.xs, x)
+        if i < len(self.xs) and self.xs[i] == x and self.ys[i] == y:
+            self.area -= self._contribution(i)
+            del self.xs[i], self.ys[i]
+
+
+class Hypervolume:
+    """Hypervolume of successive generations, updated from
+    front of previous generation.
+    """
+
+    def __init__(self, reference):
+
+        self.reference = np.asarray(reference, dtype=float)
+        self.value     = 0.0
+        self.values    = []
+        self.front     = set()
+        self.staircase = Staircase(self.reference) if len(self.reference) == 2 else None
+
+    def __str__(self):
+        return ''.join([
+            "Hypervolume: ", str(self.value),
+            "\tFront: ",     str(len(self.front)),
+            "\tGenerations: ", str(len(self.values))
+        ])
+
+    def update(self, points):
+        """
+        Hypervolume of points of a generation, appended
+        to values.
+        """
+        points = np.asarray(points, dtype=float).reshape(-1, len(self.reference))
+        points = points[np.all(points < self.reference, axis=1)]
+        front  = set()
+        if len(points):
+            front = set(map(tuple, np.unique(points[non_dominated_sort(points) == 0], axis=0).tolist()))
+
+        removed = self.front - front
+        added   = front - self.front
+
+        if self.staircase is not None:
+            for point in removed:
+                self.staircase.remove(*point)
+            for point in added:
+                self.staircase.add(*point)
+            self.value = self.staircase.area
+        elif len(removed) + len(added) > len(front)/2:
+            self.value = hypervolume(list(front), self.reference) if front else 0.0
+        else:
+            # remaining points stay mutually non-dominated
+            current = list(self.front)
+            for point in removed:
+                current.remove(point)
+                self.value -= contribution(point, current, self.reference)
+            for point in added:
+                self.value += contribution(point, current, self.reference)
+                current.append(point)
+
+        self.front = front
+        self.values.append(self.value)
+        return self.value
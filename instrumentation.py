@@ -0,0 +1,103 @@
+"""
+Instrumentation
+===============
+
+Time and number of calls of each phase of an algorithm
+(selection, mutation, crossover, decode, evaluate, ...).
+
+    timer = PhaseTimer()
+    next_generation(population, timer=timer)
+    print(timer)
+
+Phases are exclusive: time of a phase nested into another
+phase is only counted for the inner phase.
+
+Algorithms default to NO_TIMER, which does not measure
+anything and costs one call per phase.
+
+"""
+
+from collections import OrderedDict
+from contextlib import nullcontext
+from time import perf_counter
+
+
+class PhaseTimer:
+    """Seconds and calls per phase
+
+    callback: optional function(name, seconds), called at
+              the end of each phase
+    """
+
+    def __init__(self, callback=None):
+
+        self.callback = callback
+        self.seconds  = OrderedDict()
+        self.calls    = OrderedDict()
+        self._stack   = []
+
+    def __call__(self, name):
+        return _Phase(self, name)
+
+    def __str__(self):
+        total = sum(self.seconds.values()) or 1
+        return '\n'.join([
+            ''.join([
+                name, ":\t", str(round(self.seconds[name], 6)), " s",
+                "\tCalls: ", str(self.calls[name]),
+                "\tShare: ", str(round(self.seconds[name]/total, 3))
+            ]) for name in self.seconds
+        ])
+
+    def report(self):
+        return dict((name, {'seconds': self.seconds[name], 'calls': self.calls[name]})
+                    for name in self.seconds)
+
+    def reset(self):
+        self.seconds.clear()
+        self.calls.clear()
+
+
+class _Phase:
+
+    __slots__ = ('timer', 'name', 'start', 'nested')
+
+    def __init__(self, timer, name):
+        self.timer = timer
+        self.name  = name
+
+    def __enter__(self):
+        self.nested = 0.0
+        self.timer._stack.append(self)
+        self.start  = perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        elapsed = perf_counter() - self.start
+        timer   = self.timer
+        timer._stack.pop()
+        if timer._stack:
+            timer._stack[-1].nested += elapsed
+
+        seconds = elapsed - self.nested
+        timer.seconds[self.name] = timer.seconds.get(self.name, 0.0) + seconds
+        timer.calls[self.name]   = timer.calls.get(self.name, 0) + 1
+        if timer.callback:
+            timer.callback(self.name, seconds)
+        return False
+
+
+class _NoTimer:
+    """Disabled timer, every phase is the same empty context
+    """
+
+    _context = nullcontext()
+
+    def __call__(self, name):
+        return self._context
+
+    def __str__(self):
+        return ''
+
+
+NO_TIMER = _NoTimer()
@@ -0,0 +1,159 @@
+"""
+Island Model Genetic Algorithm
+==============================
+
+Several populations (islands) evolve independently by
+the genetic algorithm, each island in its own process.
+Every K generations the best individuals migrate to
+neighbouring islands, where they replace the worst.
+
+
+Algorithm
+---------
+- Initialization of one population per island
+- Loop until 100 generations
+  - each island (in parallel)
+    - K generations of genetic algorithm
+  - migration of best individuals along topology
+- Champion of each generation is the best champion
+  of all islands
+
+
+Topology
+--------
+ring:            island i sends to island i+1
+fully_connected: each island sends to all other islands
+
+"""
+
+from multiprocessing import Pool, cpu_count
+import numpy as np
+
+import genetic_algorithm as ga
+from selection import ranked_indices
+
+
+TOPOLOGIES = ['ring', 'fully_connected']
+
+
+def evolve_island(args):
+    """
+    Evolve one island for a number of generations, returns
+    population, champion of each generation and hits and
+    misses of the worker's fitness cache.
+    """
+    population, generations, mutation_probability, seed = args
+
+    # processes of a pool are forked with identical state
+    # of random number generator
+    np.random.seed(seed)
+
+    cache     = ga.CylinderPhenotype.cache
+    lookups   = (cache.hits, cache.misses)
+    champions = []
+    for _ in range(generations):
+        population = ga.next_generation(population, mutation_probability=mutation_probability)
+        champions.append(ga.get_champion(population))
+
+    return population, champions, (cache.hits - lookups[0], cache.misses - lookups[1])
+
+def neighbours(island, number_islands, topology):
+    if topology == 'ring':
+        return [(island+1) % number_islands] if number_islands > 1 else []
+    elif topology == 'fully_connected':
+        return [i for i in range(number_islands) if i != island]
+    raise ValueError('unknown topology: ' + str(topology))
+
+def migrate(populations, topology='ring', number_migrants=2):
+    """
+    Copy best individuals of each island to its neighbours,
+    immigrants replace the worst individuals.
+    """
+    emigrants = [ population.genotypes[ranked_indices(population)[:number_migrants]]
+                  for population in populations ]
+
+    immigrants = [[] for _ in populations]
+    for island in range(len(populations)):
+        for neighbour in neighbours(island, len(populations), topology):
+            immigrants[neighbour].append(emigrants[island])
+
+    for population, arrivals in zip(populations, immigrants):
+        if not arrivals:
+            continue
+        arrivals = np.concatenate(arrivals)[:len(population)]
+        worst    = ranked_indices(population)[len(population)-len(arrivals):]
+        population.genotypes[worst] = arrivals
+        population.changed[worst]   = True
+        population.calculate_decimals()
+        population.evaluate()
+
+    return populations
+
+def merge_champions(island_champions):
+    """
+    Best champion of all islands for each generation.
+    """
+    return [ga.get_champion([c for c in champions if c is not None])
+             for champions in zip(*island_champions)]
+
+def evolve_islands( number_islands, size_population, number_generations,
+                    mutation_probability=0.01, migration_interval=10,
+                    number_migrants=2, topology='ring', processes=None, seed=None ):
+    """
+    Run island model, returns champion of each generation.
+    """
+    if topology not in TOPOLOGIES:
+        raise ValueError('unknown topology: ' + str(topology))
+
+    seeds       = np.random.SeedSequence(seed)
+    populations = []
+    for island_seed in seeds.spawn(number_islands):
+        np.random.seed(island_seed.generate_state(1))
+        populations.append(ga.initialize_population(size=size_population))
+
+    champions = []
+    with Pool(processes=processes or min(number_islands, cpu_count())) as pool:
+        generation = 0
+        while generation < number_generations:
+            generations = min(migration_interval, number_generations-generation)
+            results     = pool.map(evolve_island, [
+                (population, generations, mutation_probability, island_seed.generate_state(1))
+                for population, island_seed in zip(populations, seeds.spawn(number_islands))
+            ])
+            populations = [population for population, _, _ in results]
+            champions  += merge_champions([island_champions for _, island_champions, _ in results])
+            generation += generations
+
+            # evaluated in workers: lookups of this process's cache
+            cache = ga.CylinderPhenotype.cache
+            for _, _, (hits, misses) in results:
+                cache.hits   += hits
+                cache.misses += misses
+
+            if generation < number_generations:
+                populations = migrate(populations, topology=topology, number_migrants=number_migrants)
+
+    return champions
+
+
+def main():
+
+    NUMBER_ISLANDS       = cpu_count()
+    SIZE_POPULATION      = 30
+    NUMBER_GENERATIONS   = 100
+    MUTATION_PROBABILITY = 0.01
+    MIGRATION_INTERVAL   = 10
+    NUMBER_MIGRANTS      = 2
+    TOPOLOGY             = 'ring'
+
+    champions = evolve_islands( NUMBER_ISLANDS, SIZE_POPULATION, NUMBER_GENERATIONS,
+                                mutation_probability=MUTATION_PROBABILITY,
+                                migration_interval=MIGRATION_INTERVAL,
+                                number_migrants=NUMBER_MIGRANTS,
+                                topology=TOPOLOGY )
+
+    ga.create_summary(champions)
+
+
+if __name__ == '__main__':
+    main()
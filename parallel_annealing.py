@@ -0,0 +1,213 @@
+"""
+Parallel Annealing
+==================
+
+Simulated annealing (simulated_annealing.py) with several
+chains, each running in its own process.
+
+
+Multi-start
+-----------
+Independent chains from random tours, each with the cooling
+schedule of simulated_annealing.py. The shortest tour of
+all chains is returned.
+
+
+Parallel tempering (replica exchange)
+-------------------------------------
+- One replica (chain) per temperature of a geometric
+  ladder between T_MIN and T_MAX
+- Loop until EXCHANGES
+  - each replica searches ITERATIONS moves at its constant
+    temperature
+  - replicas at neighbouring temperatures exchange states
+    with probability
+
+    min(1, exp((1/T_cold - 1/T_hot) * (E_cold - E_hot)))
+
+    E: tour length, even and odd pairs alternate
+- Shortest tour found by any replica is returned
+
+Hot replicas cross barriers, good tours travel down the
+ladder to the cold replicas. Instead of tours, the
+temperatures are exchanged: replicas keep their state in
+their process, only tour lengths are sent each exchange.
+
+"""
+
+from math import exp
+from multiprocessing import Pool, Process, Pipe, cpu_count
+from random import random, shuffle
+import random as python_random
+import numpy as np
+
+import simulated_annealing as sa
+
+
+"""Multi-start
+"""
+def run_chain(args):
+    """
+    Whole annealing schedule of one chain from random tour,
+    returns shortest tour and its length.
+    """
+    instance_file, cache_size, move, T, steps, iterations, cooling, seed = args
+    python_random.seed(seed)
+    np.random.seed(seed)
+
+    instance, cities      = sa.load_instance(instance_file, cache_size)
+    propose, delta, apply = sa.bind_move(move, instance)
+
+    path = list(range(cities))
+    shuffle(path)
+    path_len = instance.path_length(path)
+    shortest, shortest_len = path, path_len
+    tour = sa.Tour(path)
+    for _ in range(steps):
+        tour, path_len, shortest, shortest_len = sa.anneal(
+            tour, path_len, shortest, shortest_len, T, iterations, propose, delta, apply)
+        T = cooling*T
+    return [shortest, shortest_len]
+
+def multi_start( number_chains, instance_file=None, cache_size=None, move='two_opt', T=3000,
+                 steps=200, iterations=200, cooling=0.8, processes=None, seed=None ):
+
+    seeds = np.random.SeedSequence(seed).spawn(number_chains)
+    with Pool(processes=processes or min(number_chains, cpu_count())) as pool:
+        results = pool.map(run_chain, [
+            (instance_file, cache_size, move, T, steps, iterations, cooling, int(chain_seed.generate_state(1)[0]))
+            for chain_seed in seeds
+        ])
+    return min(results, key=lambda result: result[1])
+
+
+"""Parallel tempering
+"""
+def temperature_ladder(number, T_min, T_max):
+    """
+    Geometric ladder, coldest first.
+    """
+    if number == 1:
+        return [float(T_min)]
+    return [T_min*(T_max/T_min)**(k/(number - 1)) for k in range(number)]
+
+def replica(connection, instance_file, cache_size, move, seed):
+    """
+    Chain in its own process. Receives (T, iterations) and
+    answers current tour length, None ends the chain and is
+    answered by shortest tour and its length.
+    """
+    python_random.seed(seed)
+    np.random.seed(seed)
+
+    instance, cities      = sa.load_instance(instance_file, cache_size)
+    propose, delta, apply = sa.bind_move(move, instance)
+
+    path = list(range(cities))
+    shuffle(path)
+    path_len = instance.path_length(path)
+    shortest, shortest_len = path, path_len
+    tour = sa.Tour(path)
+    connection.send(path_len)
+
+    while True:
+        message = connection.recv()
+        if message is None:
+            connection.send([shortest, shortest_len])
+            return
+        T, iterations = message
+        tour, path_len, shortest, shortest_len = sa.anneal(
+            tour, path_len, shortest, shortest_len, T, iterations, propose, delta, apply)
+        connection.send(path_len)
+
+def exchange(lengths, temperatures, holders, parity):
+    """
+    Metropolis swap criterion between replicas at neighbouring
+    temperatures, holders[k] is replica at temperature k.
+    Returns number of exchanges.
+    """
+    exchanges = 0
+    for k in range(parity, len(temperatures) - 1, 2):
+        cold, hot = holders[k], holders[k+1]
+        exponent  = (1/temperatures[k] - 1/temperatures[k+1])*(lengths[cold] - lengths[hot])
+        if exponent >= 0 or random() < exp(exponent):
+            holders[k], holders[k+1] = hot, cold
+            exchanges += 1
+    return exchanges
+
+def parallel_tempering( number_replicas, instance_file=None, cache_size=None, move='two_opt',
+                        T_min=1, T_max=3000, exchanges=200, iterations=200, seed=None ):
+    """
+    Returns shortest tour, its length and rate of accepted
+    exchanges.
+    """
+    temperatures = temperature_ladder(number_replicas, T_min, T_max)
+    holders      = list(range(number_replicas))
+    seeds        = np.random.SeedSequence(seed)
+    python_random.seed(int(seeds.generate_state(1)[0]))
+
+    connections, processes = [], []
+    for replica_seed in seeds.spawn(number_replicas):
+        parent, child = Pipe()
+        process = Process( target=replica,
+                           args=(child, instance_file, cache_size, move, int(replica_seed.generate_state(1)[0])) )
+        process.start()
+        connections.append(parent)
+        processes.append(process)
+
+    try:
+        lengths  = [connection.recv() for connection in connections]
+        accepted = 0
+        pairs    = 0
+        for number in range(exchanges):
+            for k, i in enumerate(holders):
+                connections[i].send((temperatures[k], iterations))
+            lengths   = [connection.recv() for connection in connections]
+            accepted += exchange(lengths, temperatures, holders, number % 2)
+            pairs    += len(range(number % 2, number_replicas - 1, 2))
+
+        results = []
+        for connection in connections:
+            connection.send(None)
+            results.append(connection.recv())
+    finally:
+        for process in processes:
+            process.join(timeout=1)
+            if process.is_alive():
+                process.terminate()
+
+    shortest, shortest_len = min(results, key=lambda result: result[1])
+    return [shortest, shortest_len, float(accepted)/pairs if pairs else 0.0]
+
+
+def main():
+
+    # 'tempering' or 'multi_start'
+    MODE       = 'tempering'
+    # number of chains, one process each (ladder of at least two)
+    CHAINS     = max(2, cpu_count())
+    # TSPLIB file, None: Swiss cities of simulated_annealing_data
+    INSTANCE   = None
+    CACHE_SIZE = None
+    MOVE       = 'two_opt'
+    # temperature ladder of parallel tempering
+    T_MIN      = 1
+    T_MAX      = 3000
+    # exchanges and moves between exchanges
+    EXCHANGES  = 200
+    ITERATIONS = 200
+
+    if MODE == 'tempering':
+        shortest, shortest_len, rate = parallel_tempering(
+            CHAINS, INSTANCE, CACHE_SIZE, MOVE, T_MIN, T_MAX, EXCHANGES, ITERATIONS )
+        print('Exchange Rate: ', round(rate, 3))
+    else:
+        shortest, shortest_len = multi_start(CHAINS, INSTANCE, CACHE_SIZE, MOVE)
+
+    instance, _ = sa.load_instance(INSTANCE, CACHE_SIZE)
+    instance.path_print(shortest)
+    print('\nDistance: ', shortest_len)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,143 @@
+"""
+Parameter Sweep
+===============
+
+Compare configurations of the genetic algorithm. Every
+combination of
+
+    MUTATION_PROBABILITY x SIZE_POPULATION x NUMBER_GENERATIONS
+
+is run with several seeds in a process pool.
+
+
+Report per configuration
+------------------------
+- mean, median and quantiles of fitness of the superchamp
+  (best individual of a run)
+- time to target: generations and seconds until a champion
+  reaches target fitness, averaged over runs reaching it
+- success: share of runs reaching target fitness
+
+"""
+
+from itertools import product
+from multiprocessing import Pool
+from time import perf_counter
+import numpy as np
+
+import genetic_algorithm as ga
+
+
+def run_configuration(args):
+    """
+    Single run of genetic algorithm.
+    """
+    mutation_probability, size_population, number_generations, seed, target = args
+
+    np.random.seed(seed)
+    # fitness cache lives as long as the worker, each run starts
+    # with an empty one such that runs are timed alike
+    ga.CylinderPhenotype.cache.clear()
+    start = perf_counter()
+
+    population        = ga.initialize_population(size=size_population)
+    champions         = []
+    target_generation = None
+    target_seconds    = None
+
+    for generation in range(number_generations):
+        population = ga.next_generation(population, mutation_probability=mutation_probability)
+        champions.append(ga.get_champion(population))
+
+        if target_generation is None and champions[-1] is not None \
+        and champions[-1].fitness <= target:
+            target_generation = generation + 1
+            target_seconds    = perf_counter() - start
+
+    superchamp = ga.get_champion([c for c in champions if c is not None])
+
+    return {
+        'mutation_probability': mutation_probability,
+        'size_population':      size_population,
+        'number_generations':   number_generations,
+        'seed':                 seed,
+        'fitness':              superchamp.fitness if superchamp else None,
+        'target_generation':    target_generation,
+        'target_seconds':       target_seconds,
+        'seconds':              perf_counter() - start
+    }
+
+def summarize(runs, quantiles=(0.1, 0.25, 0.75, 0.9)):
+    """
+    Statistics of all runs of one configuration.
+    """
+    fitness = np.array([run['fitness'] for run in runs if run['fitness'] is not None])
+    reached = [run for run in runs if run['target_generation'] is not None]
+
+    summary = {
+        'mutation_probability': runs[0]['mutation_probability'],
+        'size_population':      runs[0]['size_population'],
+        'number_generations':   runs[0]['number_generations'],
+        'runs':                 len(runs),
+        'success':              float(len(reached))/len(runs),
+        'target_generation':    np.mean([run['target_generation'] for run in reached]) if reached else None,
+        'target_seconds':       np.mean([run['target_seconds'] for run in reached]) if reached else None,
+        'mean':                 fitness.mean() if len(fitness) else None,
+        'median':               np.median(fitness) if len(fitness) else None
+    }
+    for q in quantiles:
+        summary['q' + str(int(q*100))] = np.quantile(fitness, q) if len(fitness) else None
+
+    return summary
+
+def sweep( mutation_probabilities, sizes_population, numbers_generations,
+           seeds=10, target=251.5, processes=None ):
+    """
+    Run every combination of parameters with `seeds` seeds,
+    returns one summary per combination.
+    """
+    grid  = list(product(mutation_probabilities, sizes_population, numbers_generations))
+    tasks = [ (p, size, generations, seed, target)
+              for p, size, generations in grid
+              for seed in range(seeds) ]
+
+    with Pool(processes=processes) as pool:
+        runs = pool.map(run_configuration, tasks, chunksize=max(1, int(len(tasks)/64)))
+
+    return [summarize(runs[i*seeds:(i+1)*seeds]) for i in range(len(grid))]
+
+def print_summaries(summaries):
+
+    def fmt(value):
+        return '-' if value is None else str(round(value, 3))
+
+    for summary in summaries:
+        print(''.join([
+            "p: ",           str(summary['mutation_probability']),
+            "\tSize: ",      str(summary['size_population']),
+            "\tGen: ",       str(summary['number_generations']),
+            "\tMean: ",      fmt(summary['mean']),
+            "\tMedian: ",    fmt(summary['median']),
+            "\tQ10: ",       fmt(summary['q10']),
+            "\tQ90: ",       fmt(summary['q90']),
+            "\tSuccess: ",   fmt(summary['success']),
+            "\tTarget Gen: ", fmt(summary['target_generation']),
+            "\tTarget s: ",  fmt(summary['target_seconds'])
+        ]))
+
+
+def main():
+
+    MUTATION_PROBABILITIES = [0.005, 0.01, 0.02, 0.1, 0.2]
+    SIZES_POPULATION       = [30]
+    NUMBERS_GENERATIONS    = [100]
+    SEEDS                  = 20
+    # minimal surface: d=8, h=6 -> 251.33
+    TARGET                 = 251.5
+
+    print_summaries(sweep( MUTATION_PROBABILITIES, SIZES_POPULATION, NUMBERS_GENERATIONS,
+                           seeds=SEEDS, target=TARGET ))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,161 @@
+"""
+Pareto
+======
+
+Dominance based ranking of objective vectors, all
+objectives are minimized. Objectives are given as matrix
+with one row per individual, one column per objective.
+
+a dominates b:  a <= b in every objective and
+                a <  b in at least one objective
+
+
+Non-dominated sorting
+---------------------
+Front 0 holds all individuals not dominated by any other
+individual, front k those only dominated by fronts < k.
+
+Two objectives: sweep over individuals sorted by first
+objective, an individual belongs to the first front whose
+minimal second objective is greater than its own. The
+minima of fronts are increasing, the front is found by
+binary search: O(n log n).
+
+More objectives: individuals sorted lexicographically can
+only be dominated by preceding ones. The first front without
+a dominating individual is found by binary search over the
+fronts, dominance within a front is tested with NumPy.
+
+
+Crowding distance
+-----------------
+Within each front: sum over objectives of the normalized
+distance between both neighbours of an individual, boundary
+individuals have infinite distance.
+
+"""
+
+from bisect import bisect_right
+import numpy as np
+
+
+def dominates(a, b):
+    return np.all(a <= b) and np.any(a < b)
+
+def non_dominated_sort(objectives):
+    """
+    Front index (rank) of each individual.
+    """
+    objectives = np.asarray(objectives, dtype=float)
+    if not len(objectives):
+        return np.zeros(0, dtype=np.int64)
+
+    # identical objective vectors share their front
+    unique, inverse = np.unique(objectives, axis=0, return_inverse=True)
+    inverse = inverse.reshape(-1)
+
+    if unique.shape[1] == 1:
+        ranks = np.arange(len(unique))
+    elif unique.shape[1] == 2:
+        ranks = _sweep(unique)
+    else:
+        ranks = _binary_search(unique)
+
+    return ranks[inverse]
+
+def _sweep(objectives):
+    """
+    Two objectives, distinct rows sorted lexicographically
+    (as returned by np.unique).
+    """
+    ranks  = np.empty(len(objectives), dtype=np.int64)
+    minima = []
+    for i, second in enumerate(objectives[:, 1].tolist()):
+        front = bisect_right(minima, second)
+        if front == len(minima):
+            minima.append(second)
+        else:
+            minima[front] = second
+        ranks[i] = front
+    return ranks
+
+def _binary_search(objectives):
+    """
+    Any number of objectives, distinct rows sorted
+    lexicographically (efficient non-dominated sort with
+    binary search). Only preceding individuals can dominate
+    an individual. If a front holds a dominating individual,
+    so do all fronts before, the first front without one is
+    found by binary search.
+    """
+    ranks  = np.empty(len(objectives), dtype=np.int64)
+    # members of each front in growing buffers
+    fronts = []
+    sizes  = []
+    for i, point in enumerate(objectives):
+        low, high = 0, len(fronts)
+        while low < high:
+            middle = (low + high)//2
+            if np.any(np.all(fronts[middle][:sizes[middle]] <= point, axis=1)):
+                low = middle + 1
+            else:
+                high = middle
+        if low == len(fronts):
+            fronts.append(np.empty((4, objectives.shape[1])))
+            sizes.append(0)
+        if sizes[low] == len(fronts[low]):
+            fronts[low] = np.concatenate([fronts[low], np.empty_like(fronts[low])])
+        fronts[low][sizes[low]] = point
+        sizes[low] += 1
+        ranks[i] = low
+    return ranks
+
+def crowding_distance(objectives, ranks):
+    """
+    Crowding distance of each individual within its front.
+    """
+    objectives = np.asarray(objectives, dtype=float)
+    distance   = np.zeros(len(objectives))
+    if not len(objectives):
+        return distance
+
+    for column in objectives.T:
+        order  = np.lexsort((column, ranks))
+        values = column[order]
+        fronts = ranks[order]
+
+        # boundaries of fronts within sorted order
+        first = np.r_[True, fronts[1:] != fronts[:-1]]
+        last  = np.r_[fronts[1:] != fronts[:-1], True]
+
+        starts = np.flatnonzero(first)
+        span   = np.maximum.reduceat(values, starts) - np.minimum.reduceat(values, starts)
+        span   = np.repeat(span, np.diff(np.r_[starts, len(values)]))
+
+        gap = np.zeros(len(values))
+        inner = ~(first | last)
+        gap[inner] = (values[2:] - values[:-2])[inner[1:-1]]
+        gap = np.where(span > 0, gap/np.where(span > 0, span, 1), 0)
+        gap[first | last] = np.inf
+
+        distance[order] += gap
+
+    return distance
+
+def crowded_tournament(ranks, crowding, number):
+    """
+    Binary tournaments: lower front wins, within the same
+    front larger crowding distance wins. Returns indices
+    of winners.
+    """
+    a = np.random.randint(0, len(ranks), number)
+    b = np.random.randint(0, len(ranks), number)
+    a_wins = (ranks[a] < ranks[b]) | ((ranks[a] == ranks[b]) & (crowding[a] >= crowding[b]))
+    return np.where(a_wins, a, b)
+
+def crowded_truncation(ranks, crowding, number):
+    """
+    Indices of best `number` individuals by front,
+    then by descending crowding distance.
+    """
+    return np.lexsort((-crowding, ranks))[:number]
@@ -0,0 +1,334 @@
+"""
+Pareto Archive
+==============
+
+External archive of the non-dominated individuals seen
+over a whole run, updated incrementally with every new
+individual. All objectives are minimized, see pareto.py.
+
+An offered individual is rejected, in case an archived one
+weakly dominates it (identical objective vectors are kept
+once). Otherwise it is added and every archived individual
+it dominates is removed.
+
+
+Index
+-----
+Two objectives: skyline, archived individuals sorted by
+first objective have strictly decreasing second objective.
+Only the predecessor of a new individual can dominate it,
+the individuals it dominates are its direct successors.
+Both are found by binary search.
+
+More objectives: ND-tree (A. Jaszkiewicz, T. Lust, 2018),
+each node knows the ideal (lower bound) and nadir (upper
+bound) point of its individuals. Whole subtrees are
+skipped, in case the new individual and the box between
+ideal and nadir point are mutually non-dominated. Leaves
+holding more than LEAF_SIZE individuals are split into
+BRANCHING children of nearby individuals.
+
+
+Size bound
+----------
+maxsize = None: unbounded
+maxsize = n:    as soon as more than n are archived, the
+                individual with smallest crowding distance
+                is removed, extremes are always kept.
+
+"""
+
+from bisect import bisect_left, bisect_right
+import numpy as np
+
+from pareto import crowding_distance
+
+
+LEAF_SIZE = 20
+BRANCHING = 6
+
+
+def weakly_dominates(a, b):
+    return all(x <= y for x, y in zip(a, b))
+
+def dominates(a, b):
+    return weakly_dominates(a, b) and any(x < y for x, y in zip(a, b))
+
+def squared_distance(a, b):
+    return sum((x - y)**2 for x, y in zip(a, b))
+
+
+class ParetoArchive:
+    """Non-dominated individuals, each archived with its
+    objective vector.
+    """
+
+    def __init__(self, maxsize=None):
+
+        self.maxsize = maxsize
+        self.offered = 0
+        self._index  = None
+
+    def __str__(self):
+        return ''.join([
+            "Archive Size: ", str(len(self)),
+            "\tOffered: ",    str(self.offered)
+        ])
+
+    def __len__(self):
+        return len(self._index) if self._index is not None else 0
+
+    def __iter__(self):
+        """
+        Pairs (objectives, item), no particular order.
+        """
+        if self._index is not None:
+            for pair in self._index:
+                yield pair
+
+    def items(self):
+        return [item for _, item in self]
+
+    def objectives(self):
+        return np.array([objectives for objectives, _ in self])
+
+    def dominated(self, objectives):
+        """
+        True, in case an archived individual weakly
+        dominates objectives.
+        """
+        return self._index is not None and self._index.dominated(tuple(objectives))
+
+    def add(self, objectives, item=None):
+        """
+        Offer an individual, True in case it was archived.
+        """
+        objectives = tuple(float(value) for value in objectives)
+        self.offered += 1
+        if self._index is None:
+            self._index = Skyline() if len(objectives) == 2 else NDTree()
+
+        if not self._index.insert(objectives, item):
+            return False
+        if self.maxsize is not None and len(self._index) > self.maxsize:
+            self.prune()
+        return True
+
+    def update(self, pairs):
+        """
+        Offer pairs (objectives, item), returns number archived.
+        """
+        return sum(self.add(objectives, item) for objectives, item in pairs)
+
+    def prune(self):
+        """
+        Remove most crowded individuals until maxsize is met.
+        """
+        while len(self._index) > self.maxsize:
+            points   = [objectives for objectives, _ in self._index]
+            crowding = crowding_distance(np.array(points), np.zeros(len(points), dtype=np.int64))
+            self._index.remove(points[int(np.argmin(crowding))])
+
+
+class Skyline:
+    """Two objectives, sorted by first objective
+    """
+
+    def __init__(self):
+
+        self.firsts  = []
+        self.seconds = []
+        self.items   = []
+
+    def __len__(self):
+        return len(self.firsts)
+
+    def __iter__(self):
+        for first, second, item in zip(self.firsts, self.seconds, self.items):
+            yield ((first, second), item)
+
+    def dominated(self, point):
+        # predecessor has smallest second objective of all
+        # individuals with smaller or equal first objective
+        i = bisect_right(self.firsts, point[0])
+        return i > 0 and self.seconds[i-1] <= point[1]
+
+    def insert(self, point, item):
+        if self.dominated(point):
+            return False
+
+        start = bisect_left(self.firsts, point[0])
+        end   = start
+        while end < len(self.seconds) and self.seconds[end] >= point[1]:
+            end += 1
+
+        self.firsts[start:end]  = [point[0]]
+        self.seconds[start:end] = [point[1]]
+        self.items[start:end]   = [item]
+        return True
+
+    def remove(self, point):
+        i = bisect_left(self.firsts, point[0])
+        if i < len(self.firsts) and self.seconds[i] == point[1]:
+            del self.firsts[i], self.seconds[i], self.items[i]
+
+
+class Node:
+    """Node of ND-tree, leaves hold individuals
+    """
+
+    __slots__ = ('ideal', 'nadir', 'points', 'children', 'parent')
+
+    def __init__(self, point, parent=None):
+
+        self.ideal    = list(point)
+        self.nadir    = list(point)
+        self.points   = []
+        self.children = None
+        self.parent   = parent
+
+    def include(self, point):
+        self.ideal = [min(a, b) for a, b in zip(self.ideal, point)]
+        self.nadir = [max(a, b) for a, b in zip(self.nadir, point)]
+
+    def distance(self, point):
+        # to center of box
+        return squared_distance([(low + high)/2 for low, high in zip(self.ideal, self.nadir)], point)
+
+    def __iter__(self):
+        if self.children is None:
+            for pair in self.points:
+                yield pair
+        else:
+            for child in self.children:
+                for pair in child:
+                    yield pair
+
+
+class NDTree:
+    """Any number of objectives. Bounds of nodes are not
+    tightened on removal, they stay valid (conservative).
+    """
+
+    def __init__(self, leaf_size=LEAF_SIZE, branching=BRANCHING):
+
+        self.leaf_size = leaf_size
+        self.branching = branching
+        self.root      = None
+        self.size      = 0
+
+    def __len__(self):
+        return self.size
+
+    def __iter__(self):
+        if self.root is not None:
+            for pair in self.root:
+                yield pair
+
+    def dominated(self, point):
+        return self.root is not None and self._dominated(self.root, point)
+
+    def _dominated(self, node, point):
+        if weakly_dominates(node.nadir, point):
+            return True
+        if not weakly_dominates(node.ideal, point):
+            return False
+        if node.children is None:
+            return any(weakly_dominates(other, point) for other, _ in node.points)
+        return any(self._dominated(child, point) for child in node.children)
+
+    def insert(self, point, item):
+        if self.root is not None and not self._update(self.root, point):
+            return False
+
+        if self.root is None:
+            self.root = Node(point)
+            node      = self.root
+        else:
+            node = self.root
+            node.include(point)
+            while node.children is not None:
+                node = min(node.children, key=lambda child: child.distance(point))
+                node.include(point)
+
+        node.points.append((point, item))
+        self.size += 1
+        if len(node.points) > self.leaf_size:
+            self._split(node)
+        return True
+
+    def _update(self, node, point):
+        """
+        False, in case point is weakly dominated. Removes
+        individuals dominated by point.
+        """
+        if weakly_dominates(node.nadir, point):
+            return False
+        if dominates(point, node.ideal):
+            self._remove_node(node)
+            return True
+        if not (weakly_dominates(node.ideal, point) or weakly_dominates(point, node.nadir)):
+            # mutually non-dominated with whole box
+            return True
+
+        if node.children is None:
+            for other, _ in node.points:
+                if weakly_dominates(other, point):
+                    return False
+            kept = [pair for pair in node.points if not dominates(point, pair[0])]
+            self.size  -= len(node.points) - len(kept)
+            node.points = kept
+            if not kept:
+                self._remove_node(node)
+            return True
+
+        for child in list(node.children):
+            if not self._update(child, point):
+                return False
+        return True
+
+    def _split(self, leaf):
+        # seeds: individuals far from each other
+        points = leaf.points
+        seeds  = [max(points, key=lambda pair: squared_distance(pair[0], leaf.nadir))]
+        while len(seeds) < self.branching:
+            seeds.append(max( points, key=lambda pair: min(
+                squared_distance(seed[0], pair[0]) for seed in seeds) ))
+
+        leaf.children = [Node(seed[0], leaf) for seed in seeds]
+        for pair in points:
+            child = min(leaf.children, key=lambda child: child.distance(pair[0]))
+            child.include(pair[0])
+            child.points.append(pair)
+        leaf.children = [child for child in leaf.children if child.points]
+        leaf.points   = None
+
+    def _remove_node(self, node):
+        self.size -= sum(1 for _ in node)
+        parent     = node.parent
+        while parent is not None:
+            parent.children.remove(node)
+            if parent.children:
+                return
+            node, parent = parent, parent.parent
+        self.root = None
+
+    def remove(self, point):
+        leaf = self._find(self.root, point)
+        if leaf is None:
+            return
+        leaf.points = [pair for pair in leaf.points if pair[0] != point]
+        self.size  -= 1
+        if not leaf.points:
+            self._remove_node(leaf)
+
+    def _find(self, node, point):
+        if node is None or not (weakly_dominates(node.ideal, point) and weakly_dominates(point, node.nadir)):
+            return None
+        if node.children is None:
+            return node if any(other == point for other, _ in node.points) else None
+        for child in node.children:
+            leaf = self._find(child, point)
+            if leaf is not None:
+                return leaf
+        return None
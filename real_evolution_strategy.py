@@ -0,0 +1,301 @@
+"""
+Real Valued Evolution Strategy
+==============================
+
+Self-adaptive evolution strategy in R^n. Unlike the binary
+encoded evolution_strategy.py, each individual is a vector
+of object parameters together with one step size (mutation
+strength) per dimension.
+
+
+Algorithm
+---------
+- Initialization of population (uniform within bounds)
+- Evaluate population
+- Loop until 100 generations
+  - intermediate recombination of RHO parents per offspring
+  - log-normal mutation of step sizes, then gaussian
+    mutation of object parameters
+  - evaluate offsprings (whole batch at once)
+  - selection of MU best
+    - comma: (MU/RHO, LAMBDA), offsprings only
+    - plus:  (MU/RHO + LAMBDA), parents younger than KAPPA
+             and offsprings
+
+
+Strategy parameters
+-------------------
+Defined in evolution_strategy.py
+
+Size of population
+MU = 7
+
+Maximum age of a phenotype (plus selection)
+KAPPA = 15
+
+Number of offsprings
+LAMBDA = 49
+
+Number of parents per offspring
+RHO = 3
+
+"""
+
+from math import sqrt
+import numpy as np
+from terminalplot import plot
+
+import evolution
+from evolution import MaxGenerations, Stagnation
+from instrumentation import PhaseTimer, NO_TIMER
+from selection import ranked_indices
+# strategy parameters of evolution_strategy.py
+from evolution_strategy import MU, KAPPA, LAMBDA, RHO
+
+
+# lower limit of step sizes
+MIN_SIGMA = 1e-12
+
+
+class Problem:
+    """Objective function with box constraints
+
+    objective: matrix of object parameters (one row per
+               individual) -> arrays (fitness, constraint)
+    """
+
+    def __init__(self, objective, lower, upper):
+
+        self.objective   = objective
+        self.lower       = np.asarray(lower, dtype=float)
+        self.upper       = np.asarray(upper, dtype=float)
+        self.evaluations = 0
+
+    @property
+    def dimension(self):
+        return len(self.lower)
+
+    def evaluate(self, objects):
+        self.evaluations += len(objects)
+        return self.objective(objects)
+
+    def clip(self, objects):
+        return np.clip(objects, self.lower, self.upper)
+
+
+def cylinder(objects):
+    diameter = objects[:, 0]
+    height   = objects[:, 1]
+    # surface
+    fitness    = np.pi*diameter**2/2 + np.pi*diameter*height
+    # volume greater than 300
+    constraint = np.pi*diameter**2*height/4 >= 300
+    return (fitness, constraint)
+
+def sphere(objects):
+    return ((objects**2).sum(axis=1), np.ones(len(objects), dtype=bool))
+
+
+CYLINDER = Problem(cylinder, lower=[0, 0], upper=[31, 31])
+
+
+class RealPhenotype:
+    """Individual (phenotype, creature)
+    """
+
+    def __init__(self, objects, sigmas, fitness=None, constraint=None, age=0):
+
+        # Object parameters
+        self.objects    = objects
+        self.fitness    = fitness
+        self.constraint = constraint
+
+        # Strategy parameters
+        self.sigmas     = sigmas
+        self.age        = age
+
+    def __str__(self):
+        return ''.join([
+            "Objects: ",      str(np.round(self.objects, 3)),
+            "\tFitness: ",    str(self.fitness),
+            "\tConstraint: ", str(self.constraint),
+            "\tAge: ",        str(self.age),
+            "\tSigmas: ",     str(np.round(self.sigmas, 3))
+        ])
+
+
+class RealPopulation:
+    """Whole population (struct of arrays), one row per individual
+    """
+
+    def __init__(self, objects, sigmas, fitness=None, constraint=None, age=None):
+
+        self.objects    = objects
+        self.sigmas     = sigmas
+        self.fitness    = fitness
+        self.constraint = constraint
+        self.age        = age if age is not None else np.zeros(len(objects), dtype=np.int64)
+
+    def __len__(self):
+        return len(self.objects)
+
+    def __getitem__(self, i):
+        return RealPhenotype( self.objects[i].copy(), self.sigmas[i].copy(),
+                              float(self.fitness[i]), bool(self.constraint[i]), int(self.age[i]) )
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+    def take(self, indices):
+        return RealPopulation( self.objects[indices], self.sigmas[indices],
+                               self.fitness[indices], self.constraint[indices], self.age[indices] )
+
+    def evaluate(self, problem):
+        self.fitness, self.constraint = problem.evaluate(self.objects)
+        return [self.fitness, self.constraint]
+
+
+"""Evolution strategy methodologies
+"""
+def initialize_population(size=MU, problem=CYLINDER, sigma=None):
+    """
+    Object parameters uniform within bounds, step sizes
+    a tenth of range unless given.
+    """
+    objects = problem.lower + np.random.random((size, problem.dimension))*(problem.upper - problem.lower)
+    sigma   = (problem.upper - problem.lower)/10 if sigma is None else sigma
+    sigmas  = np.ones((size, problem.dimension))*sigma
+
+    population = RealPopulation(objects, sigmas)
+    population.evaluate(problem)
+
+    return population
+
+def next_generation( population, problem=CYLINDER, nr_offsprings=LAMBDA, rho=RHO,
+                     kappa=KAPPA, plus=False, timer=NO_TIMER ):
+
+    with timer('crossover'):
+        objects, sigmas = recombine(population, nr_offsprings, rho)
+    with timer('mutation'):
+        objects, sigmas = mutate(objects, sigmas, problem)
+
+    offsprings = RealPopulation(objects, sigmas)
+    with timer('evaluate'):
+        offsprings.evaluate(problem)
+
+    with timer('selection'):
+        next_generation = select_phenotypes(population, offsprings, len(population), kappa, plus)
+        next_generation.age += 1
+
+    return next_generation
+
+def recombine(population, nr_offsprings, rho):
+    """
+    Intermediate recombination: object parameters and step
+    sizes of an offspring are the mean of rho distinct parents.
+    """
+    rho     = min(rho, len(population))
+    parents = np.argsort(np.random.random((nr_offsprings, len(population))), axis=1)[:, :rho]
+    return [population.objects[parents].mean(axis=1), population.sigmas[parents].mean(axis=1)]
+
+def mutate(objects, sigmas, problem):
+    """
+    Self-adaptation of step sizes: one global and one
+    component wise log-normal factor, then gaussian
+    mutation of object parameters with new step sizes.
+    """
+    n = objects.shape[1]
+    # tau0: global, tau: component wise learning rate
+    tau0 = 1/sqrt(2*n)
+    tau  = 1/sqrt(2*sqrt(n))
+
+    sigmas = sigmas*np.exp( tau0*np.random.standard_normal((len(sigmas), 1))
+                            + tau*np.random.standard_normal(sigmas.shape) )
+    sigmas = np.maximum(sigmas, MIN_SIGMA)
+
+    objects = problem.clip(objects + sigmas*np.random.standard_normal(objects.shape))
+    return [objects, sigmas]
+
+def select_phenotypes(parents, offsprings, mu=MU, kappa=KAPPA, plus=False):
+    """
+    Truncation selection of mu best, from offsprings only
+    (comma) or from offsprings and parents younger than
+    kappa (plus).
+    """
+    candidates = offsprings
+    if plus:
+        survivors  = parents.take(np.flatnonzero(parents.age < kappa))
+        candidates = RealPopulation(
+            np.concatenate([survivors.objects, offsprings.objects]),
+            np.concatenate([survivors.sigmas, offsprings.sigmas]),
+            np.concatenate([survivors.fitness, offsprings.fitness]),
+            np.concatenate([survivors.constraint, offsprings.constraint]),
+            np.concatenate([survivors.age, offsprings.age])
+        )
+
+    if len(candidates) < mu:
+        raise ValueError('less candidates than mu, increase number of offsprings')
+
+    return candidates.take(ranked_indices(candidates)[:mu])
+
+def get_champion(population):
+
+    feasible = np.flatnonzero(population.constraint)
+    if not len(feasible):
+        return None
+    return population[feasible[np.argmin(population.fitness[feasible])]]
+
+def evolve( population, problem=CYLINDER, nr_offsprings=LAMBDA, rho=RHO,
+            kappa=KAPPA, plus=False, stop=(), timer=NO_TIMER ):
+    """
+    Yield generations until one of the stop criteria is met,
+    see evolution.py.
+    """
+    return evolution.evolve( population,
+                             lambda population: next_generation( population, problem, nr_offsprings,
+                                                                 rho, kappa, plus, timer ),
+                             get_champion=get_champion,
+                             count_evaluations=lambda: problem.evaluations,
+                             stop=stop )
+
+
+"""Plot
+"""
+def create_summary(champions):
+    """
+    Plot fitness of the best individual of each generation
+    """
+    champions = [champion for champion in champions if champion is not None]
+    plot(range(len(champions)), [champion.fitness for champion in champions])
+    superchamp = min(champions, key=lambda champion: champion.fitness)
+    print(''.join([
+        'Superchamp Objects: ', str(np.round(superchamp.objects, 3)),
+        ' Fitness: ', str(superchamp.fitness)
+    ]))
+
+
+def main():
+
+    NUMBER_GENERATIONS = 100
+    # stop after generations without improvement
+    STAGNATION         = 50
+    # True: (MU/RHO + LAMBDA), False: (MU/RHO, LAMBDA)
+    PLUS               = False
+    # print time spent in each phase
+    INSTRUMENT         = False
+
+    timer      = PhaseTimer() if INSTRUMENT else NO_TIMER
+    population = initialize_population(size=MU, problem=CYLINDER)
+    champions  = [ generation.champion for generation in evolve(
+                       population, problem=CYLINDER, plus=PLUS, timer=timer,
+                       stop=[MaxGenerations(NUMBER_GENERATIONS), Stagnation(STAGNATION)] ) ]
+
+    create_summary(champions)
+    print('Evaluations: ', CYLINDER.evaluations)
+    if INSTRUMENT:
+        print(timer)
+
+
+if __name__ == '__main__':
+    main()
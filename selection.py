@@ -0,0 +1,71 @@
+"""
+Selection
+=========
+
+Rank based selection shared by genetic algorithm,
+evolution strategy and VEGA, ranking of populations with
+constraint.
+
+
+Stochastic universal sampling
+-----------------------------
+The interval [0, 1) is split into sub intervals, one
+per rank, with length of its selection probability.
+Instead of drawing one random number per selected
+individual, the wheel is spun once and n evenly spaced
+pointers are placed on it
+
+    start, start + 1/n, start + 2/n, ...    start ~ U[0, 1/n)
+
+Every pointer is located in the cumulative probability
+interval by binary search: O(n log n) for n pointers.
+Selected individuals never deviate more than one from
+their expected number of copies.
+
+
+Ranking
+-------
+Populations as struct of arrays (fitness, constraint) are
+ranked by fitness, individuals violating the constraint
+rank last.
+
+"""
+
+import numpy as np
+
+
+def rank_based_selection(size, number):
+    """
+    Select `number` ranks out of `size` ranked individuals,
+    returns indices into the ranked list (rank 1 is index 0).
+    """
+    if not size:
+        raise ValueError('no individual to select from')
+    return stochastic_universal_sampling(get_probability_interval(size), number)
+
+def stochastic_universal_sampling(probability_interval, number):
+    """
+    Single spin with `number` evenly spaced pointers over
+    cumulative probability interval.
+    """
+    pointers = (np.random.random() + np.arange(number))/number
+    indices  = np.searchsorted(probability_interval, pointers)
+
+    # guard against rounding of last boundary below 1
+    return np.minimum(indices, len(probability_interval)-1)
+
+def ranked_indices(population):
+    """
+    Indices of individuals from best to worst,
+    individuals violating constraint are worst.
+    """
+    fitness = np.where(population.constraint, population.fitness, np.inf)
+    return np.argsort(fitness, kind='stable')
+
+def get_probability_interval(max_rank):
+    """
+    Create list with probability of ranks, interval
+    of rank 1 is first in list
+    """
+    sum_ranks = max_rank*(max_rank+1)/2
+    return np.cumsum(np.arange(max_rank, 0, -1))/sum_ranks
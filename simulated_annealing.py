@@ -46,13 +46,16 @@ Distance:  2052
 
 """
 
+import os
 from math import exp
-from random import random, sample
-from copy import copy
+from random import random, sample, choice, randint, randrange
+import numpy as np
 
 import simulated_annealing_data as data
-from simulated_annealing_data import path_length as length
-from simulated_annealing_data import path_print
+import tsplib
+from simulated_annealing_data import distance
+import checkpoint
+from instrumentation import PhaseTimer, NO_TIMER
 
 
 #BOLTZMANN = 1.3808 * 10 ** (-23)
@@ -63,51 +66,420 @@ def metropolis(E1, E0, T):
 	"""
 	return exp((E0 - E1) / (T * BOLTZMANN)) if E0 < E1 else 1
 
-def two_opt(path0):
-	path1 = copy(path0)
-	# generate non-neighbouring permutation
-	x = True
-	while x:
-		p = sample(range(len(p2)), 4)
-		x = abs(p[0]-p[1]) == 1 or abs(p[2]-p[3]) == 1
-	path1[p[0]], p2[p[1]] = path1[p[1]], p2[p[0]]
-	path1[p[2]], p2[p[3]] = path1[p[3]], p2[p[2]]
-	return p2
+
+"""Tour
+Round trip as array of cities and array of positions (index
+of each city), changed in place. A move is applied only
+once it is accepted, its delta is known before.
+"""
+class Tour:
+	"""Cities in order of round trip, positions of cities.
+	Segments are reversed in place: either the segment or
+	the rest of the round trip, whichever is shorter (the
+	same round trip, read in the other direction).
+
+	Positions are built when first used (moves on candidate
+	lists), and kept up to date from then on. Moves on
+	positions only (uniform moves) do not pay for them.
+	"""
+
+	def __init__(self, path):
+
+		self.cities     = list(path)
+		self._positions = None
+
+	def __len__(self):
+		return len(self.cities)
+
+	@property
+	def positions(self):
+		if self._positions is None:
+			self._positions = [0]*len(self.cities)
+			for i, city in enumerate(self.cities):
+				self._positions[city] = i
+		return self._positions
+
+	def succ(self, city):
+		i = self.positions[city] + 1
+		return self.cities[i if i < len(self.cities) else 0]
+
+	def pred(self, city):
+		return self.cities[self.positions[city] - 1]
+
+	def reverse(self, i, j):
+		"""Reverse cities at positions i..j (round trip, i > j wraps)
+		"""
+		cities, positions = self.cities, self._positions
+		n      = len(cities)
+		length = (j - i) % n + 1
+		if 2*length > n:
+			i, j, length = (j + 1) % n, (i - 1) % n, n - length
+		if not length:
+			return self
+		if i <= j:
+			cities[i:j+1] = cities[i:j+1][::-1]
+			indices       = range(i, j+1)
+		else:
+			# segment wraps around end of array
+			segment = (cities[i:] + cities[:j+1])[::-1]
+			cities[i:], cities[:j+1] = segment[:n-i], segment[n-i:]
+			indices = list(range(i, n)) + list(range(j+1))
+		if positions is not None:
+			for k in indices:
+				positions[cities[k]] = k
+		return self
+
+	def swap(self, i, j):
+		cities = self.cities
+		cities[i], cities[j] = cities[j], cities[i]
+		if self._positions is not None:
+			self._positions[cities[i]], self._positions[cities[j]] = i, j
+		return self
+
+	def two_opt(self, a, b, c, d):
+		"""Edges (a, b), (c, d) -> (a, c), (b, d), where a b and
+		c d follow each other in the same direction
+		"""
+		if self.succ(a) == b:
+			return self.reverse(self.positions[b], self.positions[c])
+		return self.reverse(self.positions[c], self.positions[b])
+
+	def exchange(self, a, b, c, d, e, f, reverse=False):
+		"""Round trip a b..c d..e f becomes a d..e b..c f, or
+		a d..e c..b f (reverse) by 2-opt moves
+		"""
+		self.two_opt(a, b, e, f)
+		self.two_opt(a, e, d, c)
+		if not reverse:
+			self.two_opt(e, c, b, f)
+		return self
+
+
+"""Moves
+A move changes a few edges of the tour only, its delta
+(change of tour length) is computed from those edges in
+O(1), without walking the whole tour. Distances are those
+of the Swiss cities unless distance of an instance is given.
+"""
+def two_opt_move(tour):
+	"""Positions i < j, segment i..j is reversed.
+	Reversal of the whole tour is no move.
+	"""
+	while True:
+		i, j = sorted(sample(range(len(tour)), 2))
+		if j - i < len(tour) - 1:
+			return (i, j)
+
+def two_opt_delta(tour, move, distance=distance):
+	"""Edges (a, b) and (c, d) are replaced by (a, c) and (b, d)
+	"""
+	i, j = move
+	path = tour.cities
+	a, b = path[i-1], path[i]
+	c, d = path[j], path[(j+1) % len(path)]
+	return distance(a, c) + distance(b, d) - distance(a, b) - distance(c, d)
+
+def two_opt(tour, move=None):
+	i, j = move if move is not None else two_opt_move(tour)
+	return tour.reverse(i, j)
+
+def swap_move(tour):
+	"""Positions i < j of cities which are exchanged
+	"""
+	return tuple(sorted(sample(range(len(tour)), 2)))
+
+def swap_delta(tour, move, distance=distance):
+	i, j = move
+	path = tour.cities
+	n    = len(path)
+	if j - i == n - 1:
+		# path[j] precedes path[i] in round trip
+		i, j = j, i
+	if (j - i) % n == 1:
+		# neighbours: edges (a, b), (b, c), (c, d) -> (a, c), (c, b), (b, d)
+		a, b, c, d = path[i-1], path[i], path[j], path[(j+1) % n]
+		return distance(a, c) + distance(b, d) - distance(a, b) - distance(c, d)
+	a, b, c = path[i-1], path[i], path[(i+1) % n]
+	x, y, z = path[j-1], path[j], path[(j+1) % n]
+	return distance(a, y) + distance(y, c) + distance(x, b) + distance(b, z) \
+	     - distance(a, b) - distance(b, c) - distance(x, y) - distance(y, z)
+
+def swap(tour, move=None):
+	i, j = move if move is not None else swap_move(tour)
+	return tour.swap(i, j)
+
+# move name: (propose, delta, apply)
+MOVES = {
+	'two_opt': (two_opt_move, two_opt_delta, two_opt),
+	'swap':    (swap_move, swap_delta, swap)
+}
+
+
+"""Candidate moves
+New edges of a move always connect a city to one of its
+NEIGHBOURS nearest cities (candidate lists), hopeless moves
+with long edges are never proposed. Moves are given by
+cities, such that they hold in either direction of a tour.
+
+2-opt:     (a, b), (c, d) -> (a, c), (b, d), c near a,
+           segment b..c is reversed
+Or-opt:    segment of 1 to 3 cities moved between c and its
+           successor, c near first city of segment, in the
+           cheaper orientation
+3-opt:     (a, b), (c, d), (e, f) -> (a, d), (e, b), (c, f),
+           d near a, f near c, segments b..c and d..e are
+           exchanged without reversal
+"""
+NEIGHBOURS = 8
+
+class CandidateMoves:
+	"""Moves on candidate lists, one row of nearest cities
+	per city
+	"""
+
+	def __init__(self, neighbours, distance=distance, kinds=('two_opt', 'or_opt', 'three_opt')):
+
+		self.neighbours = np.asarray(neighbours).tolist()
+		self.distance   = distance
+		self.kinds      = kinds
+
+	def propose(self, tour):
+		while True:
+			kind = choice(self.kinds)
+			move = getattr(self, 'propose_' + kind)(tour)
+			if move is not None:
+				return move
+
+	def delta(self, tour, move):
+		return getattr(self, 'delta_' + move[0])(*move[1:])
+
+	def apply(self, tour, move):
+		return getattr(self, 'apply_' + move[0])(tour, *move[1:])
+
+	# 2-opt
+	def propose_two_opt(self, tour):
+		a = randrange(len(tour))
+		b = tour.succ(a)
+		c = choice(self.neighbours[a])
+		d = tour.succ(c)
+		if c == b or d == a:
+			return None
+		return ('two_opt', a, b, c, d)
+
+	def delta_two_opt(self, a, b, c, d):
+		distance = self.distance
+		return distance(a, c) + distance(b, d) - distance(a, b) - distance(c, d)
+
+	def apply_two_opt(self, tour, a, b, c, d):
+		return tour.two_opt(a, b, c, d)
+
+	# Or-opt
+	def propose_or_opt(self, tour):
+		n      = len(tour)
+		length = randint(1, 3)
+		if n < length + 3:
+			return None
+		s = randrange(n)
+		first, last = tour.cities[s], tour.cities[(s + length - 1) % n]
+		c = choice(self.neighbours[first])
+		# c neither within segment nor its predecessor
+		offset = (tour.positions[c] - s) % n
+		if offset < length or offset == n - 1:
+			return None
+		return ('or_opt', tour.pred(first), first, last, tour.succ(last), c, tour.succ(c))
+
+	def or_opt_edges(self, p, first, last, q, c, d):
+		"""Length of removed edges, added edges in forward
+		and in reversed orientation of segment
+		"""
+		distance = self.distance
+		removed  = distance(p, first) + distance(last, q) + distance(c, d)
+		forward  = distance(p, q) + distance(c, first) + distance(last, d)
+		reverse  = distance(p, q) + distance(c, last) + distance(first, d)
+		return removed, forward, reverse
+
+	def delta_or_opt(self, *cities):
+		removed, forward, reverse = self.or_opt_edges(*cities)
+		return min(forward, reverse) - removed
+
+	def apply_or_opt(self, tour, p, first, last, q, c, d):
+		# segment first..last exchanged with q..c
+		removed, forward, reverse = self.or_opt_edges(p, first, last, q, c, d)
+		return tour.exchange(p, first, last, q, c, d, reverse < forward)
+
+	# 3-opt
+	def propose_three_opt(self, tour):
+		n, positions = len(tour), tour.positions
+		a = randrange(n)
+		i = positions[a]
+		# positions relative to a: c at J, e at K
+		d = choice(self.neighbours[a])
+		J = (positions[d] - 1 - i) % n
+		if J < 1:
+			return None
+		c = tour.pred(d)
+		f = choice(self.neighbours[c])
+		K = (positions[f] - 1 - i) % n
+		if K <= J:
+			return None
+		return ('three_opt', a, tour.succ(a), c, d, tour.pred(f), f)
+
+	def delta_three_opt(self, a, b, c, d, e, f):
+		distance = self.distance
+		return distance(a, d) + distance(e, b) + distance(c, f) \
+		     - distance(a, b) - distance(c, d) - distance(e, f)
+
+	def apply_three_opt(self, tour, a, b, c, d, e, f):
+		return tour.exchange(a, b, c, d, e, f)
+
+
+def accept(path_len, delta, T):
+	"""Shorter paths always, longer ones with metropolis
+	likelihood, depending on temperature
+	"""
+	return delta < 0 or random() < metropolis(path_len + delta, path_len, T)
+
+
+def anneal(tour, path_len, shortest, shortest_len, T, iterations, propose, delta, apply, timer=NO_TIMER):
+	"""Search for solutions at constant temperature, tour is
+	changed in place. Returns tour, its length, shortest path
+	(list) and its length. Phases are timed only if a timer
+	is given, the loop without timer has no overhead.
+	"""
+	if timer is not NO_TIMER:
+		return _anneal_timed(tour, path_len, shortest, shortest_len, T, iterations, propose, delta, apply, timer)
+
+	# tour is shortest path, copied once it is left
+	at_shortest = path_len == shortest_len
+	for _ in range(iterations):
+		move       = propose(tour)
+		path_delta = delta(tour, move)
+		# continue with new path in case it is shorter
+		# or with metropolis likelihood, depending on temperature
+		# -> high temperature is more likely to take new path
+		if accept(path_len, path_delta, T):
+			if at_shortest and path_delta > 0:
+				shortest    = list(tour.cities)
+				at_shortest = False
+			apply(tour, move)
+			path_len += path_delta
+			if path_len < shortest_len:
+				shortest_len = path_len
+				at_shortest  = True
+	if at_shortest:
+		shortest = list(tour.cities)
+	return tour, path_len, shortest, shortest_len
+
+def _anneal_timed(tour, path_len, shortest, shortest_len, T, iterations, propose, delta, apply, timer):
+	"""anneal with phases propose, evaluate and accept timed
+	"""
+	at_shortest = path_len == shortest_len
+	for _ in range(iterations):
+		with timer('propose'):
+			move = propose(tour)
+		with timer('evaluate'):
+			path_delta = delta(tour, move)
+		with timer('accept'):
+			if accept(path_len, path_delta, T):
+				if at_shortest and path_delta > 0:
+					shortest    = list(tour.cities)
+					at_shortest = False
+				apply(tour, move)
+				path_len += path_delta
+				if path_len < shortest_len:
+					shortest_len = path_len
+					at_shortest  = True
+	if at_shortest:
+		shortest = list(tour.cities)
+	return tour, path_len, shortest, shortest_len
+
+def load_instance(filename=None, cache_size=None):
+	"""TSPLIB instance, Swiss cities without filename.
+	Returns instance and its number of cities
+	"""
+	if filename:
+		instance = tsplib.load(filename, cache_size)
+		return instance, len(instance)
+	return data, len(data.CITIES)
+
+def bind_move(name, instance):
+	"""Propose, delta and apply of move on distances of instance,
+	name 'candidates' for moves on candidate lists
+	"""
+	if name == 'candidates':
+		moves = CandidateMoves(instance.neighbours(NEIGHBOURS), instance.distance)
+		return moves.propose, moves.delta, moves.apply
+	propose, move_delta, apply = MOVES[name]
+	return propose, lambda tour, move: move_delta(tour, move, instance.distance), apply
+
+
+def save_checkpoint(filename, path, shortest, T, step):
+	"""Save current and shortest path, temperature, number of
+	temperature steps done and state of random number generators
+	"""
+	arrays, state = checkpoint.rng_state()
+	arrays['path']     = np.array(path, dtype=np.int32)
+	arrays['shortest'] = np.array(shortest, dtype=np.int32)
+	state['T']    = T
+	state['step'] = step
+	checkpoint.save(filename, arrays, state)
+
+def load_checkpoint(filename):
+	"""Restore state saved by save_checkpoint,
+	returns path, shortest path, temperature and step
+	"""
+	arrays, state = checkpoint.load(filename)
+	checkpoint.set_rng_state(arrays, state)
+	return [int(i) for i in arrays['path']], [int(i) for i in arrays['shortest']], state['T'], state['step']
 
 
 def main():
 
-	# initial solution
-	path = [i for i in range(len(data.CITIES))]
-	path_len     = length(path)
-	shortest     = path
-	shortest_len = path_len
-	
-	# initial temperature
-	T = 3000
+	# path of checkpoint file (resumed if existing), None: no checkpoints
+	CHECKPOINT          = None
+	CHECKPOINT_INTERVAL = 10
+	# 'two_opt', 'swap' (uniform) or 'candidates' (nearest cities)
+	MOVE                = 'candidates'
+	# TSPLIB file, None: Swiss cities of simulated_annealing_data
+	INSTANCE            = None
+	# cached distances of coordinate instances, None: no cache
+	CACHE_SIZE          = None
+	# print time spent in each phase
+	INSTRUMENT          = False
+
+	timer = PhaseTimer() if INSTRUMENT else NO_TIMER
+	instance, cities      = load_instance(INSTANCE, CACHE_SIZE)
+	propose, delta, apply = bind_move(MOVE, instance)
+
+	if CHECKPOINT and os.path.exists(CHECKPOINT):
+		path, shortest, T, start = load_checkpoint(CHECKPOINT)
+	else:
+		# initial solution
+		path     = [i for i in range(cities)]
+		shortest = path
+		# initial temperature
+		T        = 3000
+		start    = 0
+	# tour lengths are maintained incrementally
+	tour         = Tour(path)
+	path_len     = instance.path_length(path)
+	shortest_len = instance.path_length(shortest)
 	
 	# annealing
-	for _ in range(200):
-		# search for solutions at constant temperature
-		for _ in range(200):
-			path_new     = two_opt(path)
-			path_new_len = length(path_new)
-			# continue with new path in case it is shorter
-			# or with metropolis likelihood, depending on temperature
-			# -> high temperature is more likely to take new path
-			if path_new_len < path_len \
-			or metropolis(path_len, path_new_len, T) < random():
-				path     = path_new
-				path_len = path_new_len
-				if path_len < shortest_len:
-					shortest_len = path_len
-					shortest     = path
+	for step in range(start, 200):
+		tour, path_len, shortest, shortest_len = anneal(
+			tour, path_len, shortest, shortest_len, T, 200, propose, delta, apply, timer)
 		# decrease temperature
 		T = 0.8 * T
+
+		if CHECKPOINT and (step+1) % CHECKPOINT_INTERVAL == 0:
+			save_checkpoint(CHECKPOINT, tour.cities, shortest, T, step+1)
 	
 	# show result
-	path_print(shortest)
+	instance.path_print(shortest)
 	print('\nDistance: ', shortest_len)
+	if INSTRUMENT:
+		print(timer)
 
 if __name__ == '__main__':
 	main()
@@ -1,3 +1,7 @@
+import numpy as np
+
+from tsplib import nearest_neighbours
+
 # data source: http://www.auslandversicherung.de/entfernungstabelle_schweiz.html
 CITIES = [
 	'Aarau',
@@ -75,21 +79,40 @@ DISTANCES = [
 ]
 
 
+def dense_matrix(triangular):
+	"""Symmetric matrix of lower triangular distances, row k of
+	triangular holds distances of city k+1 to cities 0..k
+	"""
+	n      = len(triangular) + 1
+	matrix = np.zeros((n, n), dtype=np.int64)
+	for k, row in enumerate(triangular):
+		matrix[k+1, :k+1] = row
+	return np.ascontiguousarray(matrix + matrix.T)
+
+# built once, whole tours are looked up by fancy indexing
+MATRIX = dense_matrix(DISTANCES)
+# nested lists, fastest for single lookups
+ROWS   = MATRIX.tolist()
+
+def neighbours(k):
+	"""k nearest cities of each city
+	"""
+	return nearest_neighbours(MATRIX, k)
+
 def distance(ix_loc1, ix_loc2):
-	if ix_loc1 < ix_loc2:
-		return DISTANCES[ix_loc2-1][ix_loc1]
-	elif ix_loc1 > ix_loc2:
-		return DISTANCES[ix_loc1-1][ix_loc2]
-	else:
-		return 0
+	return ROWS[ix_loc1][ix_loc2]
 
 def path_length(path):
 
+	if isinstance(path, np.ndarray):
+		# whole tour at once, worth it for long tours
+		return int(MATRIX[path[:-1], path[1:]].sum() + MATRIX[path[-1], path[0]])
+
 	dist   = 0
 	depart = path[-1]
 	
 	for destin in path:
-		dist += distance(depart, destin)
+		dist += ROWS[depart][destin]
 		depart = destin
 
 	return dist
@@ -0,0 +1,190 @@
+"""
+Steady State Evolution Strategy
+===============================
+
+Asynchronous variant of evolution_strategy.py for fitness
+evaluations of heterogeneous duration. There are no
+generation barriers: a fixed number of evaluations is
+kept in flight in a thread or process pool, and each
+offspring is inserted into the population as soon as its
+evaluation completes. Workers never wait for the slowest
+offspring of a generation.
+
+
+Algorithm
+---------
+- Initialization of population
+- Evaluate population
+- Keep IN_FLIGHT offsprings in evaluation
+  - three parent recombination of current population
+  - mutate offspring and its strategy parameters
+- Each completed offspring
+  - is dropped, in case it violates constraint
+  - is added, in case population is smaller than MU
+  - replaces worst individual, in case it is better
+- After every LAMBDA completed offsprings (one generation)
+  - age of individuals increases
+  - individuals of age KAPPA are removed
+
+"""
+
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from multiprocessing import cpu_count
+from random import sample, choice
+
+import evolution
+from evolution import MaxGenerations, Stagnation
+import evolution_strategy as es
+from evolution_strategy import CylinderPhenotype, MU, KAPPA, LAMBDA
+
+
+class SteadyState:
+    """Stepper of asynchronous evolution: each call returns
+    population after LAMBDA more completed evaluations. Pending
+    evaluations carry over to the next call.
+
+    evaluate: genotype -> (diameter, height, fitness, constraint),
+              executed in pool
+    """
+
+    def __init__( self, executor, in_flight, mu=MU, kappa=KAPPA, nr_offsprings=LAMBDA,
+                  evaluate=es.evaluate_genotype ):
+
+        self.executor      = executor
+        self.in_flight     = in_flight
+        self.mu            = mu
+        self.kappa         = kappa
+        self.nr_offsprings = nr_offsprings
+        self.evaluate      = evaluate
+        self.futures       = {}
+
+    def __call__(self, population):
+
+        cache     = CylinderPhenotype.cache
+        completed = 0
+        while completed < self.nr_offsprings:
+
+            # refill pool, known genotypes need no evaluation
+            while len(self.futures) < self.in_flight and completed < self.nr_offsprings:
+                offspring = create_offspring(population)
+                if offspring.genotype in cache:
+                    offspring.decode()
+                    offspring.evaluate()
+                    insert(population, offspring, self.mu)
+                    completed += 1
+                else:
+                    self.futures[self.executor.submit(self.evaluate, offspring.genotype)] = offspring
+
+            if completed >= self.nr_offsprings:
+                break
+
+            done, _ = wait(self.futures, return_when=FIRST_COMPLETED)
+            for future in done:
+                offspring = self.futures.pop(future)
+                offspring.diameter, offspring.height, offspring.fitness, offspring.constraint \
+                    = future.result()
+                cache.misses += 1
+                cache.put(offspring.genotype, (offspring.fitness, offspring.constraint))
+                insert(population, offspring, self.mu)
+                completed += 1
+
+        return age(population, self.kappa)
+
+    def close(self):
+        """
+        Cancel pending evaluations.
+        """
+        for future in self.futures:
+            future.cancel()
+        self.futures.clear()
+
+
+"""Steady state methodologies
+"""
+def create_offspring(population):
+    """
+    Three parent recombination of random parents (with
+    repetition for populations smaller than three),
+    mutated offspring is not evaluated.
+    """
+    if len(population) >= 3:
+        parents = sample(population, 3)
+    else:
+        parents = [choice(population) for _ in range(3)]
+
+    offspring = CylinderPhenotype(es.three_parent_recombine(*[parent.genotype for parent in parents]))
+    return es.mutate([offspring])[0]
+
+def insert(population, offspring, mu=MU):
+    """
+    Add offspring satisfying constraint to population, in
+    place of worst individual once population is complete.
+    """
+    if not offspring.constraint:
+        return population
+    if len(population) < mu:
+        population.append(offspring)
+        return population
+
+    worst = max(range(len(population)), key=lambda i: badness(population[i]))
+    if badness(offspring) < badness(population[worst]):
+        population[worst] = offspring
+    return population
+
+def badness(phenotype):
+    """
+    Sort key, individuals violating constraint are worst.
+    """
+    return (not phenotype.constraint, phenotype.fitness)
+
+def age(population, kappa=KAPPA):
+    """
+    Increase age, remove individuals of age kappa (the
+    best individual is kept, population never gets empty).
+    """
+    for phenotype in population:
+        phenotype.age += 1
+
+    survivors = [phenotype for phenotype in population if phenotype.age < kappa]
+    if not survivors:
+        survivors = [min(population, key=badness)]
+    population[:] = survivors
+    return population
+
+def evolve(population, executor, in_flight, stop=(), **kwargs):
+    """
+    Yield population after every LAMBDA completed evaluations
+    until one of the stop criteria is met, see evolution.py.
+    """
+    stepper = SteadyState(executor, in_flight, **kwargs)
+    try:
+        for generation in evolution.evolve( population, stepper,
+                                            get_champion=es.get_champion,
+                                            count_evaluations=lambda: CylinderPhenotype.cache.misses,
+                                            stop=stop ):
+            yield generation
+    finally:
+        stepper.close()
+
+
+def main():
+
+    SIZE_POPULATION    = 7
+    NUMBER_GENERATIONS = 100
+    # stop after generations without improvement
+    STAGNATION         = 50
+    # number of evaluations running concurrently
+    IN_FLIGHT          = cpu_count()
+
+    population = es.initialize_population(size=SIZE_POPULATION)
+
+    with ProcessPoolExecutor(max_workers=IN_FLIGHT) as executor:
+        champions = [ generation.champion for generation in evolve(
+                          population, executor, IN_FLIGHT,
+                          stop=[MaxGenerations(NUMBER_GENERATIONS), Stagnation(STAGNATION)] ) ]
+
+    es.create_summary(champions)
+
+
+if __name__ == '__main__':
+    main()
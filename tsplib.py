@@ -0,0 +1,399 @@
+"""
+TSPLIB
+======
+
+Symmetric traveling salesman instances in TSPLIB format
+(http://comopt.ifi.uni-heidelberg.de/software/TSPLIB95/),
+for simulated annealing on 10^4 - 10^5 cities:
+
+    instance = load('pla33810.tsp')
+    instance.distance(0, 1)
+    instance.path_length(list(range(len(instance))))
+
+Cities are numbered from 0. An instance provides the same
+functions as simulated_annealing_data.py: distance,
+path_length, path_print and neighbours (k nearest cities of
+each city, candidate lists of moves).
+
+
+Explicit matrices
+-----------------
+EDGE_WEIGHT_TYPE: EXPLICIT
+EDGE_WEIGHT_FORMAT: FULL_MATRIX, UPPER_ROW, LOWER_ROW,
+                    UPPER_DIAG_ROW, LOWER_DIAG_ROW (and the
+                    equivalent column formats)
+
+The weights are converted once, row by row, into a full
+matrix in a binary file next to the instance (.npy). The
+matrix is memory mapped, never parsed into lists: only the
+pages of the rows in use are held in memory.
+
+
+Coordinates
+-----------
+EDGE_WEIGHT_TYPE: EUC_2D, CEIL_2D, ATT, GEO
+
+Distances are computed on demand, nothing of size n^2 is
+stored. An optional cache (cache_size) memoizes the most
+recently used distances, worth it for the trigonometry of
+GEO. Whole tours are computed at once with NumPy.
+
+Nearest cities are searched in a grid of cells, each cell
+only compares against cells around it. For GEO the grid is
+laid over latitude and longitude (approximate candidates).
+
+"""
+
+import os
+from math import sqrt, ceil, cos, acos
+import numpy as np
+
+from fitness_cache import FitnessCache
+
+
+"""Instances
+"""
+class MatrixInstance:
+    """Explicit distances, matrix may be memory mapped
+    """
+
+    def __init__(self, matrix, name=''):
+
+        self.matrix = matrix
+        self.name   = name
+
+    def __len__(self):
+        return len(self.matrix)
+
+    def __str__(self):
+        return ''.join([
+            "Instance: ",   self.name,
+            "\tCities: ",   str(len(self)),
+            "\tExplicit: ", str(type(self.matrix).__name__)
+        ])
+
+    def distance(self, ix_loc1, ix_loc2):
+        return int(self.matrix[ix_loc1, ix_loc2])
+
+    def path_length(self, path):
+        path = np.asarray(path)
+        return int(self.matrix[path[:-1], path[1:]].sum() + self.matrix[path[-1], path[0]])
+
+    def path_print(self, path):
+        path_print(self, path)
+
+    def neighbours(self, k):
+        return nearest_neighbours(self.matrix, k)
+
+
+class CoordinateInstance:
+    """Distances computed from coordinates on demand
+    """
+
+    def __init__(self, x, y, metric='EUC_2D', cache_size=None, name=''):
+
+        if metric not in METRICS:
+            raise ValueError('unsupported EDGE_WEIGHT_TYPE %s' % metric)
+        if metric == 'GEO':
+            x, y = geo_radians(x), geo_radians(y)
+
+        self.name   = name
+        self.metric = metric
+        self.x      = np.asarray(x, dtype=float)
+        self.y      = np.asarray(y, dtype=float)
+        # lists, faster for single lookups
+        self._x     = self.x.tolist()
+        self._y     = self.y.tolist()
+        self._scalar, self._vector = METRICS[metric]
+        self.cache  = FitnessCache(maxsize=cache_size) if cache_size else None
+
+    def __len__(self):
+        return len(self._x)
+
+    def __str__(self):
+        return ''.join([
+            "Instance: ",  self.name,
+            "\tCities: ",  str(len(self)),
+            "\tMetric: ",  self.metric,
+            "\tCache: ",   str(self.cache)
+        ])
+
+    def distance(self, ix_loc1, ix_loc2):
+        if self.cache is None:
+            return self._scalar(self._x[ix_loc1], self._y[ix_loc1], self._x[ix_loc2], self._y[ix_loc2])
+        key = (ix_loc1, ix_loc2) if ix_loc1 < ix_loc2 else (ix_loc2, ix_loc1)
+        return self.cache.lookup(key, lambda: self._scalar(
+            self._x[key[0]], self._y[key[0]], self._x[key[1]], self._y[key[1]]))
+
+    def path_length(self, path):
+        path = np.asarray(path)
+        succ = np.roll(path, -1)
+        return int(self._vector(self.x[path], self.y[path], self.x[succ], self.y[succ]).sum())
+
+    def path_print(self, path):
+        path_print(self, path)
+
+    def neighbours(self, k):
+        return nearest_coordinates(self.x, self.y, k)
+
+
+def path_print(instance, path):
+
+    dist   = 0
+    depart = path[-1]
+    print(dist, '\t', depart)
+
+    for destin in path:
+        dist += instance.distance(depart, destin)
+        print(dist, '\t', destin)
+        depart = destin
+
+
+"""Nearest neighbours
+"""
+def nearest_neighbours(matrix, k):
+    """
+    k nearest cities of each city (rows sorted by distance),
+    matrix is read in blocks of rows.
+    """
+    n = len(matrix)
+    k = min(k, n - 1)
+    nearest = np.empty((n, k), dtype=np.int64)
+    for start in range(0, n, BLOCK_ROWS):
+        end  = min(start + BLOCK_ROWS, n)
+        rows = np.array(matrix[start:end], dtype=float)
+        rows[np.arange(end - start), np.arange(start, end)] = np.inf
+        nearest[start:end] = sorted_nearest(rows, k)
+    return nearest
+
+def sorted_nearest(distances, k):
+    """
+    Indices of k smallest distances per row, sorted by distance.
+    """
+    if not k:
+        return np.zeros((len(distances), 0), dtype=np.int64)
+    indices = np.argpartition(distances, k - 1, axis=1)[:, :k]
+    order   = np.argsort(np.take_along_axis(distances, indices, axis=1), axis=1, kind='stable')
+    return np.take_along_axis(indices, order, axis=1)
+
+def nearest_coordinates(x, y, k):
+    """
+    k nearest cities by euclidean distance of coordinates,
+    about two cities per cell of grid. Cells around a cell
+    are added ring by ring until its k nearest are certain.
+    """
+    n = len(x)
+    k = min(k, n - 1)
+    nearest = np.empty((n, k), dtype=np.int64)
+    if k <= 0:
+        return nearest
+
+    side  = max(1, int(sqrt(n/2)))
+    width = max(x.max() - x.min(), y.max() - y.min())/side or 1.0
+    cx    = np.minimum(((x - x.min())/width).astype(np.int64), side - 1)
+    cy    = np.minimum(((y - y.min())/width).astype(np.int64), side - 1)
+    cells  = cx*side + cy
+    order  = np.argsort(cells, kind='stable')
+    bounds = np.searchsorted(cells[order], np.arange(side*side + 1))
+
+    for cell in np.unique(cells):
+        row, column = divmod(int(cell), side)
+        members     = order[bounds[cell]:bounds[cell+1]]
+        ring        = 1
+        while True:
+            low_row, high_row = max(row - ring, 0), min(row + ring, side - 1)
+            low_col, high_col = max(column - ring, 0), min(column + ring, side - 1)
+            # cells of a grid row are contiguous in order
+            candidates = np.concatenate([ order[bounds[r*side + low_col]:bounds[r*side + high_col + 1]]
+                                          for r in range(low_row, high_row + 1) ])
+            whole = low_row == 0 and low_col == 0 and high_row == side - 1 and high_col == side - 1
+            if len(candidates) > k:
+                distances = (x[members, None] - x[candidates])**2 + (y[members, None] - y[candidates])**2
+                distances[members[:, None] == candidates] = np.inf
+                found = sorted_nearest(distances, k)
+                kth   = np.take_along_axis(distances, found[:, -1:], axis=1)
+                # nothing outside the searched cells is nearer
+                if whole or np.all(kth <= (ring*width)**2):
+                    nearest[members] = candidates[found]
+                    break
+            ring += 1
+    return nearest
+
+
+"""Metrics
+TSPLIB distance functions, (scalar, vectorized)
+"""
+# earth radius, GEO
+RRR = 6378.388
+
+def geo_radians(degrees):
+    """
+    Coordinates DDD.MM (degrees, minutes) to radians.
+    """
+    degrees = np.asarray(degrees, dtype=float)
+    whole   = np.trunc(degrees)
+    return 3.141592*(whole + 5.0*(degrees - whole)/3.0)/180.0
+
+def euc_2d(x1, y1, x2, y2):
+    return int(sqrt((x1 - x2)**2 + (y1 - y2)**2) + 0.5)
+
+def euc_2d_vector(x1, y1, x2, y2):
+    return np.floor(np.hypot(x1 - x2, y1 - y2) + 0.5).astype(np.int64)
+
+def ceil_2d(x1, y1, x2, y2):
+    return int(ceil(sqrt((x1 - x2)**2 + (y1 - y2)**2)))
+
+def ceil_2d_vector(x1, y1, x2, y2):
+    return np.ceil(np.hypot(x1 - x2, y1 - y2)).astype(np.int64)
+
+def att(x1, y1, x2, y2):
+    r = sqrt(((x1 - x2)**2 + (y1 - y2)**2)/10.0)
+    t = int(r + 0.5)
+    return t + 1 if t < r else t
+
+def att_vector(x1, y1, x2, y2):
+    r = np.sqrt(((x1 - x2)**2 + (y1 - y2)**2)/10.0)
+    t = np.floor(r + 0.5)
+    return np.where(t < r, t + 1, t).astype(np.int64)
+
+def geo(lat1, lon1, lat2, lon2):
+    q1 = cos(lon1 - lon2)
+    q2 = cos(lat1 - lat2)
+    q3 = cos(lat1 + lat2)
+    return int(RRR*acos(0.5*((1.0 + q1)*q2 - (1.0 - q1)*q3)) + 1.0)
+
+def geo_vector(lat1, lon1, lat2, lon2):
+    q1 = np.cos(lon1 - lon2)
+    q2 = np.cos(lat1 - lat2)
+    q3 = np.cos(lat1 + lat2)
+    return (RRR*np.arccos(np.clip(0.5*((1.0 + q1)*q2 - (1.0 - q1)*q3), -1, 1)) + 1.0).astype(np.int64)
+
+METRICS = {
+    'EUC_2D':  (euc_2d, euc_2d_vector),
+    'CEIL_2D': (ceil_2d, ceil_2d_vector),
+    'ATT':     (att, att_vector),
+    'GEO':     (geo, geo_vector)
+}
+
+
+"""Loading
+"""
+# columns of row i of a triangular or full format
+FORMATS = {
+    'FULL_MATRIX':    lambda i, n: (0, n),
+    'UPPER_ROW':      lambda i, n: (i+1, n),
+    'LOWER_ROW':      lambda i, n: (0, i),
+    'UPPER_DIAG_ROW': lambda i, n: (i, n),
+    'LOWER_DIAG_ROW': lambda i, n: (0, i+1)
+}
+# symmetric instances: column formats equal row formats
+FORMATS['UPPER_COL']      = FORMATS['LOWER_ROW']
+FORMATS['LOWER_COL']      = FORMATS['UPPER_ROW']
+FORMATS['UPPER_DIAG_COL'] = FORMATS['LOWER_DIAG_ROW']
+FORMATS['LOWER_DIAG_COL'] = FORMATS['UPPER_DIAG_ROW']
+
+# rows symmetrized at once
+BLOCK_ROWS = 1024
+
+def load(filename, cache_size=None, matrix_file=None):
+    """
+    Instance of TSPLIB file. Explicit matrices are converted
+    to matrix_file (default: filename + '.npy') unless it is
+    newer than the instance file.
+    """
+    with open(filename) as lines:
+        header = read_header(lines)
+        name   = header.get('NAME', os.path.basename(filename))
+        n      = int(header['DIMENSION'])
+        kind   = header.get('EDGE_WEIGHT_TYPE', 'EUC_2D')
+
+        if kind == 'EXPLICIT':
+            matrix_file = matrix_file or filename + '.npy'
+            if not ( os.path.exists(matrix_file)
+                     and os.path.getmtime(matrix_file) >= os.path.getmtime(filename) ):
+                if header['SECTION'] != 'EDGE_WEIGHT_SECTION':
+                    raise ValueError('EDGE_WEIGHT_SECTION expected, found %s' % header['SECTION'])
+                convert_matrix(lines, n, header.get('EDGE_WEIGHT_FORMAT', 'FULL_MATRIX'), matrix_file)
+            return MatrixInstance(np.load(matrix_file, mmap_mode='r'), name)
+
+        if header['SECTION'] != 'NODE_COORD_SECTION':
+            raise ValueError('NODE_COORD_SECTION expected, found %s' % header['SECTION'])
+        coordinates = np.loadtxt(lines, max_rows=n, usecols=(1, 2), ndmin=2)
+        return CoordinateInstance(coordinates[:, 0], coordinates[:, 1], kind, cache_size, name)
+
+def read_header(lines):
+    """
+    Keywords up to first section, the section is
+    returned as 'SECTION'.
+    """
+    header = {}
+    for line in lines:
+        line = line.strip()
+        if not line:
+            continue
+        if line.endswith('SECTION'):
+            header['SECTION'] = line
+            return header
+        if line == 'EOF':
+            break
+        key, _, value = line.partition(':')
+        header[key.strip()] = value.strip()
+    raise ValueError('no data section')
+
+# lines parsed at once
+BATCH_LINES = 65536
+
+def numbers(lines):
+    """
+    Numbers of lines up to EOF or next section, one array
+    per batch of lines.
+    """
+    batch = []
+    for line in lines:
+        stripped = line.strip()
+        if stripped == 'EOF' or stripped.endswith('SECTION'):
+            break
+        batch.append(line)
+        if len(batch) == BATCH_LINES:
+            yield np.fromstring(''.join(batch), dtype=np.int64, sep=' ')
+            batch = []
+    if batch:
+        yield np.fromstring(''.join(batch), dtype=np.int64, sep=' ')
+
+def convert_matrix(lines, n, format, matrix_file):
+    """
+    Write weights row by row into memory mapped full matrix,
+    then mirror triangular formats.
+    """
+    if format not in FORMATS:
+        raise ValueError('unsupported EDGE_WEIGHT_FORMAT %s' % format)
+    columns = FORMATS[format]
+
+    matrix = np.lib.format.open_memmap(matrix_file + '.tmp', mode='w+', dtype=np.int32, shape=(n, n))
+    stream = numbers(lines)
+    # numbers of current batch, offset of next unused one:
+    # each number is copied once, rows may span batches and
+    # batches span rows
+    buffer = np.zeros(0, dtype=np.int64)
+    offset = 0
+    for i in range(n):
+        start, end = columns(i, n)
+        while start < end:
+            if offset == len(buffer):
+                buffer, offset = next(stream, None), 0
+                if buffer is None:
+                    raise ValueError('EDGE_WEIGHT_SECTION too short for DIMENSION %d' % n)
+            count = min(end - start, len(buffer) - offset)
+            matrix[i, start:start + count] = buffer[offset:offset + count]
+            start  += count
+            offset += count
+
+    if format != 'FULL_MATRIX':
+        # one triangle is zero: d(i, j) = max(d(i, j), d(j, i))
+        for start in range(0, n, BLOCK_ROWS):
+            end = min(start + BLOCK_ROWS, n)
+            matrix[start:end] = np.maximum(matrix[start:end], matrix[:, start:end].T)
+
+    matrix.flush()
+    del matrix
+    os.replace(matrix_file + '.tmp', matrix_file)
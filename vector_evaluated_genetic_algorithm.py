@@ -13,62 +13,145 @@ Algorithm
 - Initialization of population
 - Evaluate population
 - Loop until 100 generations
-  - split population in two parts
+  - split population in k parts, one per objective
   - each part
-    - selection (one part by best surface, other part by best volume)
+    - selection (by best value of its objective)
     - mutation
     - crossover
   - merge parts
   - evaluate individuals
 
 
-Non-dominated front is not determined.
+Objectives
+----------
+A list of Objective, each a function of the decimals
+(arrays of diameters and heights) and its direction. By
+default surface is minimized and volume maximized. All
+objectives of all new individuals are evaluated at once,
+as matrix with one row per individual, one column per
+objective (phenotype.values holds its row).
+
+
+Non-dominated front is not determined by VEGA itself, the
+non-dominated individuals of all generations are collected
+in an external archive, see pareto_archive.py. Hypervolume
+of each generation measures convergence, see hypervolume.py.
+
+
+NSGA-II
+-------
+Alternative mode (nsga2=True), which converges to the
+whole Pareto front instead of its two extremes. Surface
+and further objectives are handled alike, see pareto.py.
+
+- Loop until 100 generations
+  - non-dominated sorting and crowding distance
+  - binary tournament selection of parents by front,
+    then by crowding distance
+  - crossover and mutation of parents (offsprings)
+  - evaluate offsprings
+  - merge parents and offsprings, keep best half by
+    front, then by crowding distance
+
 """
 
 
 from random import randint, random, shuffle
 from math import log, pi
-from copy import copy
+import numpy as np
 from terminalplot import plot
 
+from selection import rank_based_selection
+from encoding import binary_to_real
+from fitness_cache import FitnessCache
+import evolution
+from evolution import MaxGenerations, Stagnation
+from instrumentation import PhaseTimer, NO_TIMER
+from pareto import non_dominated_sort, crowding_distance, crowded_tournament, crowded_truncation
+from pareto_archive import ParetoArchive
+from hypervolume import Hypervolume
+
 class CylinderPhenotype:
     """Individual (phenotype, creature)
     """
 
+    __slots__ = ('genotype', 'diameter', 'height', 'values')
+
+    # Objective values memoized by objectives and genotype,
+    # shared by all individuals. Replace to resize or disable
+    # (maxsize=0).
+    cache = FitnessCache(maxsize=1024)
+
     def __init__(self, genotype):
 
         # Genotype (properties, chromosomes)
         self.genotype   = genotype
         self.diameter   = None
         self.height     = None
-        self.surface    = None
-        self.volume     = None
+        # Objective values, in order of objectives
+        self.values     = None
 
     def __str__(self):
         return ''.join([
             "Gen: ", self.genotype[:5], ".", self.genotype[5:],
             " H: ", str(self.height),
             "\tD: ", str(self.diameter),
-            "\tSurface: ", str(self.surface),
-            "\tVolume: ", str(self.volume)
+            "\tObjectives: ", str(self.values)
         ])
 
+    # Default objectives
+    @property
+    def surface(self):
+        return self.values[0]
+
+    @property
+    def volume(self):
+        return self.values[1]
+
     def calculate_decimals(self):
         self.diameter = binary_to_real(self.genotype[:5])
         self.height   = binary_to_real(self.genotype[5:])
         return [self.diameter, self.height]
 
-    def evaluate(self):
-        # surface
-        self.surface    = pi*self.diameter**2/2 + pi*self.diameter*self.height
-        # volume greater than 300
-        self.volume = pi*self.diameter**2*self.height/4
-        return [self.surface, self.volume]
+
+class Objective:
+    """Objective function, decimals (arrays) -> array
+    """
+
+    def __init__(self, name, function, maximize=False):
+
+        self.name     = name
+        self.function = function
+        self.maximize = maximize
+
+    def __str__(self):
+        return ''.join([
+            "Objective: ",    self.name,
+            "\tMaximize: ",  str(self.maximize)
+        ])
+
+
+def surface(diameter, height):
+    return pi*diameter**2/2 + pi*diameter*height
+
+def volume(diameter, height):
+    return pi*diameter**2*height/4
+
+OBJECTIVES = [Objective('surface', surface), Objective('volume', volume, maximize=True)]
+
+def evaluate_objectives(diameter, height, objectives=OBJECTIVES):
+    """
+    Matrix of objective values, one row per individual.
+    """
+    diameter = np.asarray(diameter, dtype=float)
+    height   = np.asarray(height, dtype=float)
+    return np.column_stack([ np.broadcast_to(objective.function(diameter, height), diameter.shape)
+                             for objective in objectives ])
 
 
 """Genetic algorithm methodologies
 """
-def initialize_population(size):
+def initialize_population(size, objectives=OBJECTIVES):
 
     population = []
     for _ in range(size):
@@ -77,80 +160,87 @@ def initialize_population(size):
             ''.join([str(randint(0,1)) for _ in range(10)])
         ))
 
-        population[-1].calculate_decimals()
-        population[-1].evaluate()
+    return evaluate(population, objectives)
 
-    return population
+def next_generation(population, mutation_probability, objectives=OBJECTIVES, timer=NO_TIMER):
 
-def next_generation(population, mutation_probability):
+    if len(population) < len(objectives):
+        raise ValueError('less individuals than objectives, increase size of population')
 
     shuffle(population)
 
-    volume_gen  = population[:int(len(population)/2)]
-    surface_gen = population[int(len(population)/2):]
+    # one part per objective
+    bounds = [int(i*len(population)/len(objectives)) for i in range(len(objectives) + 1)]
+    parts  = [population[start:end] for start, end in zip(bounds[:-1], bounds[1:])]
 
-    volume_gen  = select_phenotypes(volume_gen, 'volume')
-    surface_gen = select_phenotypes(surface_gen, 'surface')
-    volume_gen  = mutate(volume_gen, mutation_probability)
-    surface_gen = mutate(surface_gen, mutation_probability)
-    volume_gen  = crossover(volume_gen)
-    surface_gen = crossover(surface_gen)
+    with timer('selection'):
+        parts = [select_phenotypes(part, i, objectives) for i, part in enumerate(parts)]
+    with timer('mutation'):
+        parts = [mutate(part, mutation_probability) for part in parts]
+    with timer('crossover'):
+        parts = [crossover(part) for part in parts]
 
-    next_generation = volume_gen + surface_gen
+    next_generation = [phenotype for part in parts for phenotype in part]
 
-    # Evaluate creatures
-    for phenotype in next_generation:
-        phenotype.calculate_decimals()
-        phenotype.evaluate()
+    return evaluate(next_generation, objectives, timer)
 
-    return next_generation
+def evaluate(population, objectives=OBJECTIVES, timer=NO_TIMER):
+    """
+    Evaluate new creatures, selected ones keep their values.
+    Unknown genotypes are evaluated at once.
+    """
+    pending = [phenotype for phenotype in population if phenotype.values is None]
+    with timer('decode'):
+        for phenotype in pending:
+            phenotype.calculate_decimals()
+    with timer('evaluate'):
+        cache   = CylinderPhenotype.cache
+        key     = tuple(objectives)
+        missing = {}
+        for phenotype in pending:
+            if phenotype.genotype in missing:
+                # duplicates within population are hits as well
+                cache.hits += 1
+                missing[phenotype.genotype].append(phenotype)
+                continue
+            values = cache.get((key, phenotype.genotype))
+            if values is None:
+                missing[phenotype.genotype] = [phenotype]
+            else:
+                phenotype.values = values
+
+        if missing:
+            groups = list(missing.values())
+            matrix = evaluate_objectives( [group[0].diameter for group in groups],
+                                          [group[0].height for group in groups], objectives )
+            for group, values in zip(groups, map(tuple, matrix.tolist())):
+                cache.put((key, group[0].genotype), values)
+                for phenotype in group:
+                    phenotype.values = values
+
+    return population
 
-def select_phenotypes(population, type):
+def select_phenotypes(population, index, objectives=OBJECTIVES):
     """
     Rank based selection (Stochastic universal sampling)
+    by objective of given index.
     """
 
-    # list, sorted by rank and filtered by constraint
-    if type == 'volume':
-        sorted_population = sorted( population,
-                                    key=lambda ind: ind.volume,
-                                    reverse=True )
-    else:
-        sorted_population = sorted( population,
-                                    key=lambda ind: ind.surface,
-                                    reverse=False )        
-
-    # List with boundaries of interval for rank probability
-    probability_interval = get_probability_interval(len(sorted_population))
-
-    selection = []
-    for _ in range(len(population)):
-        rand = random()
-        for i, sub_interval in enumerate(probability_interval):
-            if rand <= sub_interval:
-                break
-        # selected individuals are copied into selection
-        # otherwise several items in selection would point
-        # to the same individual.
-        selection.append(copy(sorted_population[i]))
-
-    return selection
-
-def get_probability_interval(max_rank):
-    """
-    Create list with probability of ranks, interval
-    of rank 1 is first in list
-    """ 
-    sum_ranks = max_rank*(max_rank+1)/2
-    interval = [float(max_rank)/sum_ranks]
-    for rank in range(max_rank-1,0,-1):
-        interval.append( interval[-1] + float(rank)/sum_ranks )
-
-    return interval
+    # list, sorted by rank
+    column            = objective_matrix(population, objectives)[:, index]
+    sorted_population = [population[i] for i in np.argsort(column, kind='stable')]
+
+    # selected individuals are not copied, an individual
+    # selected several times appears several times. Mutation
+    # and crossover copy on write.
+    return [sorted_population[i] for i in rank_based_selection(len(sorted_population), len(population))]
 
 def mutate(population, probability):
-    for phenotype in population:
-        phenotype.genotype = random_genotype_mutation(phenotype.genotype, probability)
+    for i, phenotype in enumerate(population):
+        genotype = random_genotype_mutation(phenotype.genotype, probability)
+        # copy on write, individual may be shared
+        if genotype != phenotype.genotype:
+            population[i] = CylinderPhenotype(genotype)
     return population
 
 def random_genotype_mutation(genotype, probability):
@@ -173,16 +263,14 @@ def crossover(population, breeder_size=10):
     """
     offsprings = []
     shuffle(population)
-    for _ in range(int(breeder_size/2)):
+    for _ in range(int(min(breeder_size, len(population))/2)):
         # Genotype of mother and father will be
         # replaced with genotype of offsprings
         mother = population.pop()
         father = population.pop()
         offspring_genotypes = singel_point_recombine(mother.genotype, father.genotype)
-        mother.genotype = offspring_genotypes[0]
-        father.genotype = offspring_genotypes[1]
-        offsprings.append(mother)
-        offsprings.append(father)
+        offsprings.append(CylinderPhenotype(offspring_genotypes[0]))
+        offsprings.append(CylinderPhenotype(offspring_genotypes[1]))
 
     population += offsprings
 
@@ -193,15 +281,80 @@ def singel_point_recombine(gen1, gen2):
     return [gen1[:point]+gen2[point:], gen1[point:]+gen2[:point]]
 
 
-"""Encoding and Decoding
+"""NSGA-II methodologies
 """
-def binary_to_real(bin_string, min=0, step=1):
-    base = 1
-    num = 0
-    for i in bin_string[::-1]:
-        num += base*int(i)
-        base *= 2
-    return num
+def nsga2_next_generation(population, mutation_probability, objectives=OBJECTIVES, timer=NO_TIMER):
+
+    size = len(population)
+
+    with timer('selection'):
+        ranks, crowding = rank_phenotypes(population, objectives)
+        # even number of parents, two offsprings per pair
+        parents = [population[i] for i in crowded_tournament(ranks, crowding, size + size%2)]
+    with timer('crossover'):
+        offsprings = []
+        for mother, father in zip(parents[::2], parents[1::2]):
+            for genotype in singel_point_recombine(mother.genotype, father.genotype):
+                offsprings.append(CylinderPhenotype(genotype))
+        offsprings = offsprings[:size]
+    with timer('mutation'):
+        offsprings = mutate(offsprings, mutation_probability)
+
+    offsprings = evaluate(offsprings, objectives, timer)
+
+    with timer('selection'):
+        candidates      = population + offsprings
+        ranks, crowding = rank_phenotypes(candidates, objectives)
+        next_generation = [candidates[i] for i in crowded_truncation(ranks, crowding, size)]
+
+    return next_generation
+
+def objective_matrix(population, objectives=OBJECTIVES):
+    """
+    Objectives to minimize, one row per individual:
+    maximized objectives are negated.
+    """
+    signs = np.array([-1.0 if objective.maximize else 1.0 for objective in objectives])
+    return np.array([phenotype.values for phenotype in population], dtype=float).reshape(-1, len(signs))*signs
+
+def rank_phenotypes(population, objectives=OBJECTIVES):
+    """
+    Front and crowding distance of each individual.
+    """
+    matrix = objective_matrix(population, objectives)
+    ranks  = non_dominated_sort(matrix)
+    return [ranks, crowding_distance(matrix, ranks)]
+
+def pareto_front(population, objectives=OBJECTIVES):
+    """
+    Distinct individuals not dominated by any other.
+    """
+    ranks = non_dominated_sort(objective_matrix(population, objectives))
+    front = {}
+    for phenotype, rank in zip(population, ranks):
+        if rank == 0:
+            front.setdefault(phenotype.genotype, phenotype)
+    return list(front.values())
+
+
+def evolve( population, mutation_probability=0.01, nsga2=False, hypervolume=None,
+            objectives=OBJECTIVES, stop=(), timer=NO_TIMER ):
+    """
+    Yield generations until one of the stop criteria is met,
+    see evolution.py. VEGA has no single champion, criteria
+    on fitness are ignored, unless a Hypervolume indicator is
+    given: fitness of a generation is then its negative
+    hypervolume (Stagnation stops converged runs).
+    """
+    step      = nsga2_next_generation if nsga2 else next_generation
+    indicator = None
+    if hypervolume is not None:
+        indicator = lambda population: -hypervolume.update(objective_matrix(population, objectives))
+    return evolution.evolve( population,
+                             lambda population: step(population, mutation_probability, objectives, timer),
+                             indicator=indicator,
+                             count_evaluations=lambda: CylinderPhenotype.cache.misses,
+                             stop=stop )
 
 
 def main():
@@ -209,14 +362,39 @@ def main():
     SIZE_POPULATION      = 30
     NUMBER_GENERATIONS   = 100
     MUTATION_PROBABILITY = 0.01
-
+    # False: VEGA, True: NSGA-II
+    NSGA2                = False
+    # maximum number of archived non-dominated individuals
+    ARCHIVE_SIZE         = 100
+    # worst surface and volume, bound of hypervolume
+    REFERENCE            = (5000, 0)
+    # stop after generations without hypervolume improvement
+    STAGNATION           = 50
+    # print time spent in each phase
+    INSTRUMENT           = False
+
+    timer      = PhaseTimer() if INSTRUMENT else NO_TIMER
     population = initialize_population(size=SIZE_POPULATION)
-
-    for _ in range(NUMBER_GENERATIONS):
-        population = next_generation(population, mutation_probability=MUTATION_PROBABILITY)
-
-    # Create summary: plot volume and surface of individuals
-    plot([phenotype.volume for phenotype in population],[phenotype.surface for phenotype in population])
+    # best trade-offs of all generations
+    archive    = ParetoArchive(maxsize=ARCHIVE_SIZE)
+    indicator  = Hypervolume(reference=(REFERENCE[0], -REFERENCE[1]))
+
+    for generation in evolve( population, mutation_probability=MUTATION_PROBABILITY, nsga2=NSGA2,
+                              hypervolume=indicator, timer=timer,
+                              stop=[MaxGenerations(NUMBER_GENERATIONS), Stagnation(STAGNATION)] ):
+        population = generation.population
+        archive.update(zip(objective_matrix(population), population))
+
+    # Create summary: plot volume and surface of archived individuals
+    front = sorted(archive.items(), key=lambda phenotype: phenotype.volume)
+    plot([phenotype.volume for phenotype in front],[phenotype.surface for phenotype in front])
+    for phenotype in front:
+        print(phenotype)
+    print(archive)
+    print(indicator)
+    print(CylinderPhenotype.cache)
+    if INSTRUMENT:
+        print(timer)
 
 
 if __name__ == '__main__':